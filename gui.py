@@ -3,13 +3,15 @@ import pandas as pd
 import time
 import logging
 import io
+import os
+import tempfile
 
 # Import core logic
-from src.scraper_generic import scrape_generic
-from src.scraper_lds import scrape_lds_chapter
 from src.nlp_processor import VoikkoProcessor
 from src.translator import TranslatorService
-from src.document_loader import DocumentLoader
+from src.jobs import JobManager
+from src.client import SERVER_ENV, ServiceClient
+from src.deck_merge import merge_decks
 
 # Configure logging to capture in UI? 
 # For now, standard logging, maybe redirect to st.empty() later if needed.
@@ -18,6 +20,41 @@ logger = logging.getLogger(__name__)
 
 st.set_page_config(page_title="Suomi Scraper", layout="wide")
 
+# --- Shared Resources ---
+# Streamlit re-runs this script on every interaction, so heavy objects are built once
+# per server process and reused across reruns and sessions.
+# If SUOMI_SERVER points at a running daemon (main.py --serve), it does the heavy lifting instead.
+SUOMI_SERVER = os.environ.get(SERVER_ENV)
+
+@st.cache_resource
+def get_service_client():
+    return ServiceClient(SUOMI_SERVER)
+
+@st.cache_resource(show_spinner="Initializing Voikko...")
+def get_voikko_processor():
+    if SUOMI_SERVER:
+        return get_service_client()
+    return VoikkoProcessor()
+
+@st.cache_resource(show_spinner="Loading translation cache...")
+def get_translator():
+    if SUOMI_SERVER:
+        return get_service_client()
+    return TranslatorService()
+
+@st.cache_resource
+def get_job_manager():
+    return JobManager()
+
+def load_translator():
+    """Returns the shared translator, reloading its cache if another process changed it."""
+    translator = get_translator()
+    if not SUOMI_SERVER:
+        translator.reload_if_stale()
+    return translator
+
+VOCAB_PAGE_SIZE = 100
+
 st.title("🇫🇮 Suomi Scraper & Anki Builder")
 
 # --- Sidebar Configuration ---
@@ -37,10 +74,6 @@ tab1, tab2, tab3, tab4 = st.tabs(["Single URL", "Batch Processing", "File Upload
 urls_to_process = []
 file_obj_to_process = None
 
-from src.crawler import LDSCrawler
-
-# ... imports ...
-
 with tab1:
     url_input = st.text_input("Enter URL to scrape:", placeholder="https://yle.fi/uutiset/...")
     recursive_mode = st.checkbox("Recursive Crawl (Find all chapters from this URL)", value=False)
@@ -70,15 +103,21 @@ with tab4:
     st.header("Vocabulary Cache")
     st.caption("All words previously translated and stored locally.")
     try:
-        # We need a translator instance to get cache
-        # Lazy init or just init it here?
-        tmp_trans = TranslatorService()
-        vocab_list = tmp_trans.get_cache_as_list()
+        tmp_trans = load_translator()
         
-        if vocab_list:
-             v_df = pd.DataFrame(vocab_list)
-             st.dataframe(v_df, width=1000) 
-             st.metric("Total Words", len(vocab_list))
+        vocab_search = st.text_input("Search (Finnish prefix):", key="vocab_search")
+        # Only one page is converted to a DataFrame, the full cache stays in the translator
+        _, total_matches = tmp_trans.query_cache(vocab_search, 0, 0)
+        
+        if total_matches:
+             page_count = (total_matches - 1) // VOCAB_PAGE_SIZE + 1
+             page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+             vocab_page, _ = tmp_trans.query_cache(vocab_search, (page - 1) * VOCAB_PAGE_SIZE, VOCAB_PAGE_SIZE)
+             
+             v_df = pd.DataFrame(vocab_page)
+             st.dataframe(v_df, width=1000, hide_index=True)
+             st.caption(f"Page {page} of {page_count}")
+             st.metric("Total Words", tmp_trans.query_cache("", 0, 0)[1])
              
              if st.button("Clear Cache", type="primary", help="Permanently delete translation cache"):
                  tmp_trans.clear_cache()
@@ -86,6 +125,8 @@ with tab4:
                  time.sleep(1)
                  st.rerun()
 
+        elif vocab_search:
+             st.info("No words match your search.")
         else:
              st.info("Cache is empty.")
     except Exception as e:
@@ -96,28 +137,10 @@ with tab4:
 enable_start = bool(urls_to_process or file_obj_to_process)
 
 if st.button("Start Scraping", type="primary", disabled=not enable_start):
-    
-    # Initialize Components
-    status_text = st.empty()
-    progress_bar = st.progress(0)
-    
-    doc_loader = DocumentLoader() # Init loader
-    
-    # Pre-flight: Recursive Crawl
-    if recursive_mode and url_input and urls_to_process == [url_input]:
-        status_text.text("Recursively crawling for chapters... (this may take a moment)")
-        crawler = LDSCrawler()
-        urls_to_process = crawler.crawl(url_input)
-        if not urls_to_process:
-            st.error("No chapters found in recursive crawl.")
-            st.stop()
-        st.success(f"Found {len(urls_to_process)} chapters.")
-        time.sleep(1)
-
-    status_text.text("Initializing NLP and Translator...")
+    # Fail fast on a missing LibVoikko instead of inside the background job
     try:
-        vp = VoikkoProcessor()
-        translator = TranslatorService()
+        get_voikko_processor()
+        load_translator()
     except Exception as e:
         if "LibVoikko" in str(e):
             st.error("Missing System Dependency: LibVoikko")
@@ -127,89 +150,67 @@ if st.button("Start Scraping", type="primary", disabled=not enable_start):
             st.error(f"Failed to initialize components: {e}")
             st.stop()
 
-    # Data collection
-    all_cards = []
-    seen_lemmas = set()
-    
-    # 1. Scrape & Process Loop
-    # Adjust loop to handle either URLs OR the single file
-    
-    items_to_process = urls_to_process if urls_to_process else [file_name_to_process]
-    total_steps = len(items_to_process)
+    settings = {"no_translate": no_translate, "filter_untranslated": filter_untranslated}
+    manager = get_job_manager()
 
-    for i, item in enumerate(items_to_process):
-        progress = (i / total_steps)
-        progress_bar.progress(progress)
-        status_text.text(f"Processing ({i+1}/{total_steps}): {item}")
-        
-        # Scrape / Load
-        sentences = []
-        try:
-            if file_obj_to_process and item == file_name_to_process:
-                # IT'S A FILE
-                raw_text = doc_loader.load_file(file_obj_to_process, file_name_to_process)
-                sentences = [s.strip() for s in raw_text.split('\n') if s.strip()]
-            
-            elif "churchofjesuschrist.org" in item:
-                sentences = scrape_lds_chapter(item)
-            else:
-                raw = scrape_generic(item)
-                if raw:
-                    sentences = [s.strip() for s in raw.split('\n') if s.strip()]
-        except Exception as e:
-            st.error(f"Error processing {item}: {e}")
-            continue
-
-        # Process words
-        for sentence in sentences:
-            lemmas = vp.lemmatize(sentence) # Default is now strict=True
-            # Note: The NLP processor logic currently filters names hardcoded. 
-            # If we want to toggle it via UI, we might need to modify VoikkoProcessor to accept a flag.
-            # For now, it respects the current codebase logic which filters names.
-            
-            for lemma in lemmas:
-                if len(lemma) < 2 or lemma in seen_lemmas:
-                    continue
-                seen_lemmas.add(lemma)
-                
-                # Translation
-                translation = ""
-                if not no_translate:
-                    translation = translator.translate(lemma)
-                    
-                    # Filter identicals (English/Failed) if we are filtering
-                    if filter_untranslated and translation.lower() == lemma.lower():
-                        continue
-                else:
-                    translation = "[SKIPPED]"
-                
-                # Filter explicit errors
-                if filter_untranslated and translation in ["[No translation found]", "[Not Found]", "[Error]", ""]:
-                    continue
-                    
-                card = {
-                    "Front": lemma,
-                    "Back": translation,
-                    "Tags": "suomi-scraper"
-                }
-                all_cards.append(card)
-        
-        # Politeness
-        if len(urls_to_process) > 1:
-            time.sleep(0.5)
+    if file_obj_to_process:
+        job = manager.create_job([], settings, upload_name=file_name_to_process,
+                                 upload_data=file_obj_to_process.getvalue(), name=file_name_to_process)
+    elif recursive_mode and url_input and urls_to_process == [url_input]:
+        # The crawl runs inside the job too, so it doesn't block the page
+        job = manager.create_job([], settings, crawl_url=url_input, name=url_input)
+    else:
+        job = manager.create_job(urls_to_process, settings, name=urls_to_process[0] if len(urls_to_process) == 1 else f"{len(urls_to_process)} URLs")
 
-    progress_bar.progress(1.0)
-    status_text.text("Processing Complete!")
-    
-    # Store in session state to persist after reload (if any)
-    st.session_state['cards'] = all_cards
+    job.start(get_voikko_processor(), load_translator())
+    st.session_state['review_job'] = job.job_id
+
+# --- Jobs ---
+@st.fragment(run_every=2)
+def render_jobs():
+    """Shows progress of all jobs. Re-runs on its own, without re-running the whole page."""
+    jobs = get_job_manager().list_jobs()
+    if not jobs:
+        return
+
+    st.write("### Jobs")
+    for job in jobs:
+        with st.container(border=True):
+            col_info, col_actions = st.columns([4, 1])
+            with col_info:
+                st.write(f"**{job.name}** · {job.status} · {len(job.cards)} cards")
+                st.progress(job.progress, text=job.message or None)
+            with col_actions:
+                if job.is_running:
+                    if st.button("Cancel", key=f"cancel_{job.job_id}"):
+                        job.cancel()
+                elif job.status != "done" or job.failed:
+                    if st.button("Retry failed" if job.status == "done" else "Resume", key=f"resume_{job.job_id}"):
+                        job.start(get_voikko_processor(), load_translator())
+                if st.button("Review", key=f"review_{job.job_id}"):
+                    st.session_state['review_job'] = job.job_id
+                    st.rerun()
+
+render_jobs()
+
+# Cards of the selected job (partial while it is still running)
+if 'review_job' in st.session_state:
+    review_job = get_job_manager().get(st.session_state['review_job'])
+    # Only the job id lives in the session; the job's card buffer hands out a cached
+    # DataFrame, rebuilt only when new cards arrived, so reruns don't copy the deck.
+    if review_job is None or (review_job.is_running and not review_job.cards):
+        cards_df = None
+    else:
+        cards_df = review_job.cards_frame()
+else:
+    cards_df = None
 
 # --- Results & Export ---
-if 'cards' in st.session_state and st.session_state['cards']:
+if cards_df is not None and len(cards_df):
     st.write("### Review Cards")
     st.caption("You can edit translations directly in the table below.")
     
-    df = pd.DataFrame(st.session_state['cards'])
+    df = cards_df
     
     # Editable Table
     edited_df = st.data_editor(df, num_rows="dynamic", width=1000)
@@ -219,30 +220,38 @@ if 'cards' in st.session_state and st.session_state['cards']:
     st.subheader("Merge with Existing Deck")
     merge_file = st.file_uploader("Upload existing CSV to append new cards to:", type=["csv"])
     
-    final_df = df
     if merge_file:
-        try:
-            existing_df = pd.read_csv(merge_file, sep=';')
-            st.info(f"Loaded existing deck with {len(existing_df)} cards.")
-            
-            # Concat
-            combined_df = pd.concat([existing_df, df], ignore_index=True)
-            # Remove duplicates based on 'Front'?
-            combined_df.drop_duplicates(subset=['Front'], keep='last', inplace=True) # Keep new ones? Or old? Let's keep last (newest)
-            
-            st.success(f"Merged! Total cards: {len(combined_df)}")
-            final_df = combined_df
-        except Exception as e:
-            st.error(f"Error merging files: {e}")
-
-    # Convert to CSV for download
-    csv = final_df.to_csv(sep=';', index=False).encode('utf-8')
-    
-    st.download_button(
-        label="Download Anki Deck (CSV)",
-        data=csv,
-        file_name="anki_deck_merged.csv" if merge_file else "anki_deck.csv",
-        mime="text/csv",
-    )
-elif 'cards' in st.session_state:
+        # Merging streams the uploaded deck into a temp file, only the new cards' keys are held in memory.
+        # It runs on demand instead of on every rerun; the file is removed once its bytes are read.
+        if st.button("Merge Decks"):
+            try:
+                with tempfile.TemporaryFile('w+', newline='', encoding='utf-8') as out:
+                    stats = merge_decks(merge_file, edited_df.to_dict('records'), out)
+                    out.seek(0)
+                    merged_bytes = out.read().encode('utf-8')
+                st.session_state['merged_deck'] = (merge_file.file_id, merged_bytes, stats)
+            except Exception as e:
+                st.error(f"Error merging files: {e}")
+
+        merged = st.session_state.get('merged_deck')
+        if merged and merged[0] == merge_file.file_id:
+            _, merged_bytes, stats = merged
+            st.success(f"Merged {stats['new']} new cards into existing deck of {stats['existing']} cards ({stats['replaced']} replaced). Total cards: {stats['total']}")
+            st.download_button(
+                label="Download Merged Anki Deck (CSV)",
+                data=merged_bytes,
+                file_name="anki_deck_merged.csv",
+                mime="text/csv",
+            )
+    else:
+        # Convert to CSV for download
+        csv = edited_df.to_csv(sep=';', index=False).encode('utf-8')
+        
+        st.download_button(
+            label="Download Anki Deck (CSV)",
+            data=csv,
+            file_name="anki_deck.csv",
+            mime="text/csv",
+        )
+elif cards_df is not None:
     st.warning("No valid cards found. Check your URLs or filters.")
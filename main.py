@@ -3,187 +3,487 @@ import logging
 import csv
 import time
 import sys
-from src.scraper_generic import scrape_generic
-from src.scraper_lds import scrape_lds_chapter
-from src.nlp_processor import VoikkoProcessor
-from src.translator import TranslatorService
-from src.document_loader import DocumentLoader
+import os
+# Heavy components (scrapers, loaders, Voikko, translators) are imported lazily
+# through the registry, so each subcommand only pays for what it uses.
+from src import registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-from src.crawler import LDSCrawler
+LOCAL_OWNER = "local" # Lease owner for --job-db runs without --coordinate
 
 def main():
+    from src.client import SERVER_ENV, TOKEN_ENV
     parser = argparse.ArgumentParser(description="Suomi Scraper & Anki Deck Builder")
     parser.add_argument("url", nargs="?", help="URL to scrape (optional if --file is used)")
-    parser.add_argument("--output", default="anki_deck.csv", help="Output CSV file (semicolon separated)")
+    parser.add_argument("--output", help="Output file (default: anki_deck.csv, anki_deck.parquet with --format parquet; with --vocab: stdout, vocab.parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Output format (default: from the --output extension, else csv)")
+    parser.add_argument("--stats", help="Write per-lemma run statistics (frequency, documents, first source) to this Parquet file")
     parser.add_argument("--no-translate", action="store_true", help="Skip translation step (dry run)")
     parser.add_argument("--file", help="Text file with list of URLs to scrape (one per line)")
     parser.add_argument("--recursive", action="store_true", help="Recursively find chapters from the provided URL")
+    parser.add_argument("--refresh-manifest", action="store_true", help="Rebuild the scripture chapter manifest used by --recursive, even if it isn't stale")
     parser.add_argument("--vocab", action="store_true", help="Print current vocabulary (translation cache)")
     parser.add_argument("--clear-cache", action="store_true", help="Clear the translation cache and exit")
     # parser.add_argument("--strict", action="store_true", help="Strict Mode: Discard words that Voikko cannot analyze (removes non-Finnish)")
     parser.add_argument("--append", action="store_true", help="Append to output file instead of overwriting")
+    parser.add_argument("--flush-every", type=int, default=100, help="Write cards to disk every N cards")
+    parser.add_argument("--flush-interval", type=float, default=5.0, help="... or every T seconds, whichever comes first")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="Pages/documents loaded concurrently (requests are still paced per host)")
+    parser.add_argument("--lemmatize-workers", type=int, default=1, help="Concurrent lemmatization workers")
+    parser.add_argument("--lemmatize-processes", action="store_true", help="Lemmatize in worker processes (one Voikko each) to use several cores")
+    parser.add_argument("--translate-workers", type=int, default=4, help="Concurrent translation requests for new words")
+    parser.add_argument("--hedge", action="store_true", help="Send a second request for page fetches slower than the host's p95 latency")
+    parser.add_argument("--prefetch-workers", type=int, default=2, help="Background translation of upcoming frequent words (0 disables)")
+    parser.add_argument("--sentence-glosses", action="store_true", help="Translate whole sentences in batches and derive word glosses by alignment; only unaligned words are translated one by one")
+    parser.add_argument("--gloss-file", default="aligned_glosses.json", help="Glosses derived by --sentence-glosses (kept apart from the translation cache)")
+    parser.add_argument("--serve", action="store_true", help="Run the lemmatize/translate daemon (keeps Voikko and the cache warm)")
+    parser.add_argument("--host", default="127.0.0.1", help="Daemon host (with --serve)")
+    parser.add_argument("--port", type=int, default=8765, help="Daemon port (with --serve)")
+    parser.add_argument("--socket", help="Serve on this Unix socket instead of host:port (with --serve)")
+    parser.add_argument("--token", default=os.environ.get(TOKEN_ENV), help="Shared secret the daemon/coordinator requires and clients/workers send (default: $SUOMI_TOKEN)")
+    parser.add_argument("--server", default=os.environ.get(SERVER_ENV), help="Use a running daemon, e.g. unix:/tmp/suomi.sock or 127.0.0.1:8765 (default: $SUOMI_SERVER)")
+    parser.add_argument("--job-db", help="SQLite job store: tracks each URL and its cards, so an interrupted batch resumes where it stopped")
+    parser.add_argument("--max-attempts", type=int, default=5, help="Attempts per URL before it is marked failed (with --job-db)")
+    parser.add_argument("--retry-failed", action="store_true", help="Queue URLs that exhausted their attempts again (with --job-db)")
+    parser.add_argument("--coordinate", action="store_true", help="Hand the --job-db batch out to workers over --host/--port or --socket, then export the merged deck")
+    parser.add_argument("--worker", metavar="BROKER", help="Process items from a coordinator (unix:/path, host:port) or a local job store file (*.db)")
+    parser.add_argument("--worker-id", help="Name of this worker in the broker's leases (default: host:pid)")
+    parser.add_argument("--discover", nargs="*", metavar="FEED", help="Poll RSS/Atom feeds or sitemaps (URLs, or 'yle'/'hs'; default: both) and process only new or changed articles")
+    parser.add_argument("--discovery-db", default="discovery.db", help="Index of polled feeds and processed articles (with --discover)")
+    parser.add_argument("--watch", metavar="FOLDER", help="Process only new or modified documents (PDF/DOCX/TXT) in FOLDER and append their new words to --output")
+    parser.add_argument("--watch-db", default="watch.db", help="Manifest of processed documents: size, mtime and content hash (with --watch)")
+    parser.add_argument("--archive", metavar="DIR", help="Keep the extracted segments of every source in a compressed corpus archive in DIR")
+    parser.add_argument("--from-archive", metavar="DIR", help="Build the deck from a corpus archive instead of fetching/parsing (all its sources, or the given URL/--file)")
+    parser.add_argument("--index-db", help="Index every processed sentence by lemma in this SQLite file (example sentences)")
+    parser.add_argument("--example-field", action="store_true", help="Add an Example column with a sentence from --index-db to the cards")
+    parser.add_argument("--examples", metavar="LEMMA", help="Print the best example sentences for LEMMA from --index-db and exit")
+    parser.add_argument("--top", type=int, default=5, help="Number of sentences for --examples")
+    parser.add_argument("--merge", nargs=2, metavar=("EXISTING", "NEW"), help="Merge NEW deck into EXISTING deck (streaming) and write to --output")
     args = parser.parse_args()
+
+    vocab_to_stdout = args.vocab and not args.output and args.format != "parquet"
+    if args.output is None:
+        # Defaults never overwrite another kind of output: the CSV deck, the Parquet deck, a vocabulary dump
+        if args.format == "parquet":
+            args.output = "vocab.parquet" if args.vocab else "anki_deck.parquet"
+        else:
+            args.output = "anki_deck.csv"
+    elif args.format == "parquet" and args.output.lower().endswith(".csv"):
+        parser.error("--format parquet can't write to a .csv file")
+    if args.format is None:
+        args.format = "parquet" if args.output.endswith(".parquet") else "csv"
+    if args.format == "parquet" and (args.append or args.watch):
+        parser.error("--append and --watch are not supported for Parquet output")
+    if args.watch and (args.job_db or args.discover is not None):
+        parser.error("--watch can't be combined with --job-db or --discover")
+    if args.from_archive and (args.archive or args.coordinate):
+        parser.error("--from-archive can't be combined with --archive or --coordinate")
+
+    if args.hedge:
+        from src import http_client
+        http_client.set_hedging(True)
+
+    if args.serve:
+        from src.server import serve
+        serve(args.host, args.port, args.socket, token=args.token)
+        return
+
+    if args.merge:
+        existing, new = args.merge
+        if os.path.abspath(args.output) in (os.path.abspath(existing), os.path.abspath(new)):
+            parser.error("--output must differ from the merged decks")
+        from src.deck_merge import merge_decks
+        logger.info(f"Merging {new} into {existing} -> {args.output}")
+        stats = merge_decks(existing, new, args.output)
+        logger.info(f"Done! Merged deck has {stats['total']} cards ({stats['replaced']} replaced).")
+        return
     
+    if args.worker:
+        run_worker(args)
+        return
+
+    if args.coordinate and not args.job_db:
+        parser.error("--coordinate needs --job-db")
+    if (args.example_field or args.examples) and not args.index_db:
+        parser.error("--example-field and --examples need --index-db")
+
+    examples = None
+    if args.index_db:
+        from src.example_index import ExampleIndex
+        examples = ExampleIndex(args.index_db)
+    if args.examples:
+        for sentence, source in examples.examples(args.examples, args.top):
+            print(f"{sentence}\t{source}")
+        examples.close()
+        return
+
+    archive = None
+    if args.archive or args.from_archive:
+        from src.corpus_archive import CorpusArchive
+        archive = CorpusArchive(args.archive or args.from_archive)
+
+    store = None
+    if args.job_db:
+        from src.job_store import JobStore
+        store = JobStore(args.job_db, max_attempts=args.max_attempts)
+
     urls = []
-    if args.file:
+    index, lastmods = None, {}
+    watch, watched = None, {}
+    if args.discover is not None:
+        from src.discovery import DiscoveryIndex, expand_feeds
+        index = DiscoveryIndex(args.discovery_db)
+        lastmods = dict(index.discover(expand_feeds(args.discover)))
+        urls = list(lastmods)
+        logger.info(f"Discovery: {len(urls)} new or changed articles.")
+        if not urls and not (store and store.counts()['pending']):
+            logger.info("Nothing new to process.")
+            return
+    elif args.watch:
+        from src.folder_watch import FolderManifest
+        watch = FolderManifest(args.watch_db)
+        watched = {entry[0]: entry for entry in watch.scan(args.watch)}
+        urls = list(watched)
+        if not urls:
+            logger.info("Nothing new to process.")
+            return
+        # New words are added to the end of the existing deck
+        args.append = True
+    elif args.from_archive and not (args.file or args.url):
+        urls = archive.sources()
+        logger.info(f"Rebuilding from the archive: {archive.counts()}")
+    elif store and args.recursive and not args.file and sum(store.counts().values()):
+        # Resuming: the recursive crawl is already in the store
+        logger.info(f"Resuming job store {args.job_db}: {store.counts()}")
+    elif args.file:
         with open(args.file, 'r', encoding='utf-8') as f:
             urls = [line.strip() for line in f if line.strip()]
     elif args.url:
         if args.recursive:
-            logger.info("Recursive mode enabled. Crawling for chapters...")
-            crawler = LDSCrawler()
-            urls = crawler.crawl(args.url)
-            logger.info(f"Recursive crawl finished. Found {len(urls)} URLs.")
+            logger.info("Recursive mode enabled. Looking up chapters...")
+            # Scripture volumes/books come from the chapter manifest, other pages are crawled
+            from src.manifest import find_chapters
+            urls = find_chapters(args.url, refresh=args.refresh_manifest)
+            logger.info(f"Recursive lookup finished. Found {len(urls)} URLs.")
         else:
             urls = [args.url]
     elif args.vocab or args.clear_cache:
         # Allow pass-through if only vocab/clear-cache is requested
         pass
+    elif store and sum(store.counts().values()):
+        # Resume-only call: the URLs are in the job store
+        pass
     else:
         parser.error("Must provide either URL or --file")
 
-    # 1. Initialize Components
-    logger.info("Initializing components...")
-    try:
-        vp = VoikkoProcessor()
-        translator = TranslatorService()
-    except Exception as e:
-        logger.critical(f"Initialization failed: {e}")
-        return
-
-    # 1b. Vocab View / Clear Cache
+    # 1. Vocab View / Clear Cache (no Voikko or translation engine needed)
     if args.clear_cache:
         logger.info("Clearing vocabulary cache...")
-        translator.clear_cache()
+        registry.get_translator().clear_cache()
         logger.info("Cache cleared successfully.")
         return
 
     if args.vocab:
         logger.info("Dumping vocabulary cache...")
-        vocab = translator.get_cache_as_list()
-        print(f"--- Vocabulary ({len(vocab)} words) ---")
+        translator = registry.get_translator()
+        # Streamed row by row (or in record batches), the cache isn't copied into a list
+        if args.format == "parquet":
+            from src.columnar_export import write_vocab
+            count = write_vocab(args.output, translator.iter_cache())
+            logger.info(f"Wrote {count} words to {args.output}")
+            return
+        out = sys.stdout if vocab_to_stdout else open(args.output, 'w', newline='', encoding='utf-8')
+        if vocab_to_stdout:
+            print(f"--- Vocabulary ({len(translator.cache)} words) ---")
         # Print nicely or just CSV format to stdout
-        writer = csv.DictWriter(sys.stdout, fieldnames=["Finnish", "English"], delimiter=';')
+        writer = csv.DictWriter(out, fieldnames=["Finnish", "English"], delimiter=';')
         writer.writeheader()
-        writer.writerows(vocab)
+        for row in translator.iter_cache():
+            writer.writerow(row)
+        if out is not sys.stdout:
+            out.close()
         return
 
-    # 2. Scrape Content
-    # Iterate over all URLs and collect all sentences
-    all_sentences = []
-    
-    for i, url in enumerate(urls):
-        logger.info(f"Processing URL {i+1}/{len(urls)}: {url}")
-        
-        sentences = []
-        try:
-             # Check if local file (CLI file mode)
-             # Note: current 'url' variable is just a string from the list.
-             # We need to detect if it's a file path.
-             import os
-             if os.path.exists(url) and (url.endswith('.pdf') or url.endswith('.docx') or url.endswith('.txt')):
-                 loader = DocumentLoader()
-                 raw = loader.load_file(url, url)
-                 sentences = [s.strip() for s in raw.split('\n') if s.strip()]
-             
-             elif "churchofjesuschrist.org" in url:
-                 sentences = scrape_lds_chapter(url)
-             else:
-                 # Generic URL detected
-                 raw_text = scrape_generic(url)
-                 if raw_text:
-                     sentences = [s.strip() for s in raw_text.split('\n') if s.strip()]
-
-        except Exception as e:
-            logger.error(f"Error scraping {url}: {e}")
-            continue
-        
-        current_count = len(sentences)
-        logger.info(f"  -> Found {current_count} segments.")
-        all_sentences.extend(sentences)
-        
-        # Polite delay between scrapes if processing batch
-        if len(urls) > 1:
-            time.sleep(0.5)
-
-    logger.info(f"Total: Found {len(all_sentences)} segments from {len(urls)} URLs.")
-    
-    # 3. Process Words & Build Cards
-    sentences = all_sentences
-    
-    # 3. Process Words & Build Cards
-    # We want unique words.
-    # Strategy: Iterate through sentences, extract words, checking seen set.
-    
-    # 4. Process & Write incrementally
-    logger.info(f"Processing and writing to {args.output}...")
+    if args.coordinate:
+        run_coordinator(args, store, urls, examples)
+        return
+
+    # 1b. Initialize Components
+    logger.info("Initializing components...")
+    try:
+        if args.server:
+            # Thin client: Voikko and the translation cache live in the daemon
+            from src.client import ServiceClient
+            vp = translator = ServiceClient(args.server, token=args.token)
+            logger.info(f"Using server {args.server} ({vp.health()['cache_size']} cached words)")
+        else:
+            vp = registry.get_processor()
+            translator = registry.get_translator()
+    except Exception as e:
+        logger.critical(f"Initialization failed: {e}")
+        return
+
+    if store:
+        run_durable(args, store, urls, vp, translator, index, lastmods, examples, archive)
+        return
+
+    # 2. Scrape, lemmatize, translate and write (src/pipeline.py: stages overlap, output stays in URL order)
+    logger.info(f"Processing {len(urls)} URLs and writing to {args.output}...")
     
-    fieldnames = ["Front", "Back", "Tags"]
+    from src.cards import CardBuilder, LemmaStats
+    # The item's own sentences are indexed before its cards are built, so every card finds one
+    seen = None
+    if watch and os.path.exists(args.output):
+        # Only words that aren't in the deck yet get cards
+        from src.deck_merge import deck_fronts
+        seen = deck_fronts(args.output)
+        logger.info(f"{len(seen)} words already in {args.output}.")
+    builder = CardBuilder(translator, no_translate=args.no_translate, seen=seen,
+                          examples=examples.example if args.example_field else None)
+    stats = LemmaStats() if args.stats else None
+    unchanged = None
+    if index:
+        from src.discovery import UnchangedFilter
+        unchanged = UnchangedFilter(index)
+    pipeline = make_pipeline(args, vp, builder, unchanged, examples, archive)
     
-    seen_lemmas = set()
+    completed = [] # Loaded and written (or skipped as unchanged), for the discovery index / watch manifest
+
+    def on_item(result):
+        if result.error is None:
+            completed.append(result.item)
+        if result.ok:
+            if stats:
+                for lemmas_in_sentence in result.lemma_lists:
+                    stats.observe(lemmas_in_sentence, result.item)
+            logger.info(f"  -> {result.item}: {len(result.cards)} new cards.")
     
-    # Determine mode and whether to write header
-    file_mode = 'a' if args.append else 'w'
-    write_header = True
-    if args.append and os.path.exists(args.output):
-        # If appending to existing file, don't write header
-        write_header = False
-
-    with open(args.output, file_mode, newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=';')
-        if write_header:
-            writer.writeheader()
-        
-        card_count = 0
-        for i, sentence in enumerate(sentences):
-            lemmas_in_sentence = vp.lemmatize(sentence) # Default is now strict=True
-            
-            for lemma in lemmas_in_sentence:
-                # Skip short words or unwanted
-                if len(lemma) < 2 or lemma in seen_lemmas:
-                    continue
-                    
-                seen_lemmas.add(lemma)
-                
-                # Translate
-                translation = ""
-                if not args.no_translate:
-                    translation = translator.translate(lemma)
-                    
-                    # Filter: Identical (English or Failed)
-                    if translation.lower() == lemma.lower():
-                         logger.info(f"Skipping {lemma} (translation identical/English)")
-                         continue
-                else:
-                    translation = "[SKIPPED]"
-                
-                # Filter: Explicit Errors
-                if translation in ["[No translation found]", "[Not Found]", "[Error]", ""]:
-                    logger.info(f"Skipping {lemma} (no translation found)")
-                    continue
-                
-                # Create Card
-                card = {
-                    "Front": lemma,
-                    "Back": translation,
-                    "Tags": "suomi-scraper"
-                }
-                
-                # Write immediately
-                writer.writerow(card)
-                f.flush() # Ensure it hits disk
-                
-                card_count += 1
-                
-                # Progress log
-                if card_count % 10 == 0:
-                    logger.info(f"Generated {card_count} cards...")
-
-    logger.info(f"Done! Exported {card_count} cards.")
+    # Buffered writes; in overwrite mode the deck is replaced atomically when done
+    with open_card_sink(args) as sink:
+        pipeline.drain(urls, sink, on_item)
+
+    logger.info(f"Done! Exported {sink.count} cards.")
+    log_fetch_stats()
+    if stats:
+        write_stats(args.stats, stats)
+    if index:
+        # Only now that the cards are on disk are the articles done
+        index.mark_processed((url, lastmods.get(url), unchanged.digests[url]) for url in completed)
+        index.close()
+    if watch:
+        watch.mark_processed(watched[path] for path in completed)
+        watch.close()
+    if archive:
+        archive.close()
+    if examples:
+        logger.info(f"Example index: {examples.counts()}")
+        examples.close()
+
+def make_pipeline(args, vp, builder, unchanged=None, examples=None, archive=None):
+    """
+    The load -> lemmatize -> cards pipeline with the --*-workers settings, --index-db
+    indexing, --sentence-glosses, and loading from (--from-archive) or recording to
+    (--archive) an archive.
+    """
+    from src.example_index import ExampleIndexer
+    from src.corpus_archive import ArchiveRecorder
+    extra_stages = [unchanged] if unchanged else []
+    if archive and not args.from_archive:
+        extra_stages.insert(0, ArchiveRecorder(archive))
+    lemma_stages = [ExampleIndexer(examples)] if examples else []
+    if args.sentence_glosses and not args.no_translate:
+        if hasattr(builder.translator, "translate_segments"):
+            # Before the prefetcher and cards, so aligned words are cached before anyone translates them
+            from src.sentence_gloss import GlossStore, SentenceGlosser
+            builder.glosses = GlossStore(args.gloss_file)
+            lemma_stages.append(SentenceGlosser(builder, builder.glosses))
+        else:
+            logger.warning("--sentence-glosses needs the local translator, translating word by word.")
+    from src.pipeline import card_pipeline
+    return card_pipeline(
+        vp, builder,
+        fetch_workers=args.fetch_workers,
+        lemmatize_workers=args.lemmatize_workers,
+        # A daemon client lemmatizes remotely, so its workers are threads
+        lemmatize_processes=args.lemmatize_processes and not args.server,
+        translate_workers=args.translate_workers,
+        prefetch_workers=args.prefetch_workers,
+        extra_stages=extra_stages,
+        lemma_stages=lemma_stages,
+        loader=archive.load if args.from_archive else None,
+    )
+
+def open_card_sink(args):
+    """Returns the card sink for --output/--format (CSV deck or Parquet table)."""
+    if args.format == "parquet":
+        from src.columnar_export import ParquetCardSink
+        return ParquetCardSink(args.output)
+    from src.card_sink import CsvCardSink
+    from src.cards import CARD_FIELDS
+    fieldnames = CARD_FIELDS + ["Example"] if args.example_field else CARD_FIELDS
+    return CsvCardSink(args.output, append=args.append, flush_every=args.flush_every, flush_interval=args.flush_interval,
+                       fieldnames=fieldnames)
+
+def export_store(args, store, examples=None) -> int:
+    """Writes the job store's cards to --output. The store is the source of truth, the deck is rebuilt from it."""
+    cards = store.iter_cards()
+    if args.example_field:
+        # Examples aren't stored with the cards; they come from the index at export time
+        cards = examples.with_examples(cards)
+    with open_card_sink(args) as sink:
+        sink.write_many(cards)
+    return sink.count
+
+def write_stats(path, stats):
+    from src.columnar_export import write_lemma_stats
+    count = write_lemma_stats(path, stats)
+    logger.info(f"Wrote statistics for {count} lemmas to {path}")
+
+def run_durable(args, store, urls, vp, translator, index=None, lastmods=None, examples=None, archive=None):
+    """
+    Processes the batch through the job store, each URL committed together with its cards
+    (in URL order, as the pipeline delivers them). Failed URLs are retried with backoff; the deck is exported at the end.
+    With a discovery index, articles whose content is unchanged are completed without cards.
+    """
+    from src.cards import CardBuilder, LemmaStats
+
+    added = store.add_urls(urls)
+    if args.retry_failed:
+        logger.info(f"Re-queued {store.retry_failed()} failed URLs.")
+    counts = store.counts()
+    logger.info(f"Job store: {added} new URLs. {counts['done']} done, {counts['pending']} pending, {counts['failed']} failed.")
+
+    builder = CardBuilder(translator, no_translate=args.no_translate, seen=store.seen_lemmas())
+    # Statistics cover the URLs processed by this run only (completed ones aren't re-read)
+    stats = LemmaStats() if args.stats else None
+    unchanged = None
+    if index:
+        from src.discovery import UnchangedFilter
+        unchanged = UnchangedFilter(index)
+    pipeline = make_pipeline(args, vp, builder, unchanged, examples, archive)
+
+    # Leases left behind by an interrupted run of this command
+    store.release_leases(LOCAL_OWNER)
+
+    def due_urls():
+        # Leased, so a coordinator's workers sharing the store don't take the same URLs. URLs
+        # still in the pipeline are never claimed again, even if their lease ran out
+        while True:
+            url = store.claim(LOCAL_OWNER, reclaim_own=False)
+            if url is None:
+                return
+            yield url
+
+    while True:
+        for result in pipeline.run(due_urls()):
+            url = result.item
+            store.renew_leases(LOCAL_OWNER) # For the URLs still in flight
+            if result.error is not None:
+                store.mark_failed(url, str(result.error))
+                continue
+            if result.skipped:
+                store.mark_done(url, [], set())
+            else:
+                store.mark_done(url, result.cards, result.new_lemmas)
+                if stats:
+                    for lemmas_in_sentence in result.lemma_lists:
+                        stats.observe(lemmas_in_sentence, url)
+                counts = store.counts()
+                logger.info(f"  -> ({counts['done']}/{sum(counts.values())}) {url}: {len(result.segments)} segments, {len(result.cards)} new cards.")
+            if index:
+                index.mark_processed([(url, (lastmods or {}).get(url), unchanged.digests[url])])
+
+        wait = store.seconds_until_next()
+        if wait is None:
+            break
+        # Only URLs in backoff are left
+        time.sleep(wait)
+
+    card_count = export_store(args, store, examples)
+    if stats:
+        write_stats(args.stats, stats)
+
+    for url, attempts, error in store.failed_urls():
+        logger.error(f"Failed after {attempts} attempts: {url} ({error})")
+    logger.info(f"Done! Exported {card_count} cards. {store.counts()}")
+    log_fetch_stats()
+    store.close()
+    if index:
+        index.close()
+    if examples:
+        logger.info(f"Example index: {examples.counts()}")
+        examples.close()
+    if archive:
+        archive.close()
+
+def run_coordinator(args, store, urls, examples=None):
+    """
+    Serves the job store's URLs to workers (main.py --worker) and the shared translation
+    cache, waits until every URL is done or failed, then exports the merged deck.
+    """
+    import threading
+    from src.broker import LocalBroker
+    from src.server import CoordinatorService, make_server
+
+    added = store.add_urls(urls)
+    if args.retry_failed:
+        logger.info(f"Re-queued {store.retry_failed()} failed URLs.")
+    broker = LocalBroker(store)
+    server, address = make_server(CoordinatorService(broker), args.host, args.port, args.socket, args.token)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Coordinating {added} new URLs ({broker.status()}) on {address}")
+    logger.info(f"Start workers with: python3 main.py --worker {address}")
+
+    try:
+        while True:
+            counts = broker.status()
+            if counts['pending'] == 0:
+                break
+            logger.info(f"Progress: {counts['done']} done, {counts['pending']} pending, {counts['failed']} failed.")
+            time.sleep(5)
+    finally:
+        server.shutdown()
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+    card_count = export_store(args, store, examples)
+    for url, attempts, error in store.failed_urls():
+        logger.error(f"Failed after {attempts} attempts: {url} ({error})")
+    logger.info(f"Done! Exported {card_count} cards. {store.counts()}")
+    store.close()
+    if examples:
+        examples.close()
+
+def run_worker(args):
+    """Processes items from --worker until the broker has none left."""
+    from src.broker import RemoteBroker, open_broker, run_worker as work
+
+    broker = open_broker(args.worker, args.token)
+    try:
+        # Lemmatization runs here; translations go through the coordinator's shared cache
+        vp = registry.get_processor()
+        if isinstance(broker, RemoteBroker):
+            translator = broker
+        elif args.server:
+            from src.client import ServiceClient
+            translator = ServiceClient(args.server, token=args.token)
+        else:
+            translator = registry.get_translator()
+    except Exception as e:
+        logger.critical(f"Initialization failed: {e}")
+        return
+    work(broker, vp, translator, worker_id=args.worker_id, no_translate=args.no_translate)
+    log_fetch_stats()
+
+def log_fetch_stats():
+    """Logs the fetch layer's retry/hedge counters, if anything was fetched over HTTP."""
+    http_client = sys.modules.get("src.http_client") # Not imported at all by document-only runs
+    if http_client and http_client.get_stats().snapshot()["requests"]:
+        logger.info(f"HTTP: {http_client.get_stats().summary()}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,128 @@
+import os
+import time
+import socket
+import logging
+import threading
+
+from src import registry
+from src.cards import CardBuilder
+from src.client import ServiceClient
+from src.job_store import JobStore
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300.0 # A worker that doesn't report back within this loses the URL to another
+MAX_POLL = 5.0 # Longest a worker sleeps before asking again
+
+class LocalBroker:
+    """
+    Hands out the URLs/documents of a job store to workers and collects their cards.
+    The store's card table (one card per word) and lemma table are the global
+    deduplication, so cards from different workers never repeat a word.
+    Thread-safe; several processes on one host may also open the same store file.
+    """
+    def __init__(self, store, lease_seconds: float = LEASE_SECONDS):
+        self.store = JobStore(store) if isinstance(store, str) else store
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+
+    def claim(self, worker: str) -> dict:
+        """
+        Returns {"url": url} for the next item, or {"url": None, "wait": seconds} while
+        the remaining items are leased or backing off, with wait None once all are finished.
+        """
+        with self._lock:
+            url = self.store.claim(worker, self.lease_seconds)
+            if url is not None:
+                return {"url": url}
+            return {"url": None, "wait": self.store.seconds_until_next()}
+
+    def seen(self, lemmas: list[str]) -> list[str]:
+        with self._lock:
+            return sorted(self.store.seen_among(lemmas))
+
+    def complete(self, url: str, cards: list[dict], lemmas: list[str]) -> int:
+        """Stores a finished item's cards and lemmas. Returns how many cards were new."""
+        with self._lock:
+            return self.store.mark_done(url, cards, set(lemmas))
+
+    def fail(self, url: str, error: str):
+        with self._lock:
+            self.store.mark_failed(url, error)
+
+    def status(self) -> dict:
+        with self._lock:
+            return self.store.counts()
+
+class RemoteBroker(ServiceClient):
+    """
+    Broker of a coordinator (main.py --coordinate) reached over HTTP or a Unix socket.
+    Being a ServiceClient, it also translates through the coordinator's shared cache.
+    """
+    def claim(self, worker: str) -> dict:
+        return self._call("/broker/claim", {"worker": worker})
+
+    def seen(self, lemmas: list[str]) -> list[str]:
+        return self._call("/broker/seen", {"lemmas": list(lemmas)})["seen"]
+
+    def complete(self, url: str, cards: list[dict], lemmas: list[str]) -> int:
+        return self._call("/broker/complete", {"url": url, "cards": cards, "lemmas": list(lemmas)})["stored"]
+
+    def fail(self, url: str, error: str):
+        self._call("/broker/fail", {"url": url, "error": error})
+
+    def status(self) -> dict:
+        return self._call("/broker/status")
+
+def open_broker(spec: str, token: str = None):
+    """A job store path (*.db or an existing file) gives a LocalBroker, anything else an address (see ServiceClient for token)."""
+    if spec.endswith(".db") or os.path.isfile(spec):
+        return LocalBroker(spec)
+    return RemoteBroker(spec, token=token)
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def run_worker(broker, vp, translator, worker_id: str = None, no_translate: bool = False) -> int:
+    """
+    Claims items until the broker has none left: loads and lemmatizes each one locally,
+    asks the broker which lemmas are already known anywhere, translates only the others
+    and reports the cards back. Returns the number of items this worker completed.
+    """
+    worker_id = worker_id or default_worker_id()
+    completed = 0
+    while True:
+        try:
+            claim = broker.claim(worker_id)
+        except (OSError, RuntimeError) as e:
+            # The coordinator exits once everything is done; a worker still polling then ends too
+            logger.warning(f"[{worker_id}] Broker unavailable ({e}), stopping.")
+            break
+        url = claim["url"]
+        if url is None:
+            if claim.get("wait") is None:
+                break
+            time.sleep(min(max(claim["wait"], 0.1), MAX_POLL))
+            continue
+
+        logger.info(f"[{worker_id}] Processing {url}")
+        try:
+            # Document paths must be readable on this host (e.g. a shared mount)
+            segments = registry.load_segments(url)
+            if not segments:
+                raise RuntimeError("No segments extracted")
+            lemma_lists = vp.lemmatize_many(vp.split_many(segments))
+            lemmas = list(dict.fromkeys(l for lemmas in lemma_lists for l in lemmas))
+            known = set(broker.seen(lemmas))
+            builder = CardBuilder(translator, no_translate=no_translate, seen=known)
+            cards = builder.build_many(lemma_lists, url)
+        except Exception as e:
+            logger.error(f"[{worker_id}] {url} failed: {e}")
+            broker.fail(url, str(e))
+            continue
+
+        stored = broker.complete(url, cards, [l for l in lemmas if l not in known])
+        completed += 1
+        logger.info(f"[{worker_id}]   -> {len(segments)} segments, {stored} new cards.")
+    logger.info(f"[{worker_id}] No work left, {completed} items done.")
+    return completed
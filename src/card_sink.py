@@ -0,0 +1,152 @@
+import os
+import io
+import csv
+import time
+import logging
+
+from src.cards import CARD_FIELDS
+
+logger = logging.getLogger(__name__)
+
+class CsvCardSink:
+    """
+    Buffered, crash-safe writer for semicolon-separated Anki decks.
+
+    Cards are buffered and written in batches, every flush_every cards or flush_interval
+    seconds, each batch followed by an fsync. Crash consistency depends on the mode:
+    - Overwrite (append=False): rows go to a temp file next to the output, which replaces
+      the output atomically on close(). After a crash, or when the with block is left by
+      an exception (Ctrl+C included), the old deck is untouched and the partial one discarded.
+    - Append (append=True): the output itself is the journal. Only whole rows are written
+      per batch, and a torn last row left by a crash is cut off when the file is reopened.
+
+    Use as a context manager, or call close() when done.
+    """
+    def __init__(self, path: str, append: bool = False, flush_every: int = 100,
+                 flush_interval: float = 5.0, fieldnames: list[str] = CARD_FIELDS):
+        self.path = path
+        self.append = append
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fieldnames = fieldnames
+        self.count = 0 # Cards written by this sink
+
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+        if append:
+            self._target = path
+            write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+            if not write_header:
+                self._repair_tail(path)
+        else:
+            self._target = os.path.join(os.path.dirname(os.path.abspath(path)), f".{os.path.basename(path)}.tmp")
+            if os.path.exists(self._target):
+                logger.warning(f"Found unfinished output from an interrupted run: {self._target} (overwriting)")
+            write_header = True
+
+        self._file = open(self._target, 'a' if append else 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, delimiter=';', extrasaction='ignore')
+        if write_header:
+            self._writer.writeheader()
+            self._sync()
+
+    @staticmethod
+    def _is_complete_row(line: bytes, header: bytes) -> bool:
+        """True if line parses as one CSV row with as many fields as the header."""
+        try:
+            expected = len(next(csv.reader([header.decode('utf-8').rstrip('\r\n')], delimiter=';', strict=True)))
+            row = next(csv.reader([line.decode('utf-8').rstrip('\r')], delimiter=';', strict=True))
+        except (UnicodeDecodeError, csv.Error, StopIteration):
+            return False
+        return len(row) == expected
+
+    @classmethod
+    def _repair_tail(cls, path: str):
+        """
+        Makes the file end with a newline before appending. A last line without one is
+        kept if it is a complete row (decks saved by editors, Excel or pandas often end
+        that way), and cut off if it is a torn write from a crash.
+        """
+        with open(path, 'rb+') as f:
+            f.seek(0, io.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            # Scan back for the last newline in blocks
+            start = 0
+            pos = size
+            while pos > 0:
+                step = min(8192, pos)
+                pos -= step
+                f.seek(pos)
+                idx = f.read(step).rfind(b'\n')
+                if idx != -1:
+                    start = pos + idx + 1
+                    break
+            f.seek(start)
+            tail = f.read()
+            f.seek(0)
+            header = f.readline() if start else tail
+            if cls._is_complete_row(tail, header):
+                f.seek(0, io.SEEK_END)
+                f.write(b'\r\n' if header.endswith(b'\r\n') else b'\n')
+                return
+            f.truncate(start)
+            logger.warning(f"Removed an incomplete last row from {path}")
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def write(self, card: dict):
+        self._buffer.append(card)
+        self.count += 1
+        if len(self._buffer) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def write_many(self, cards):
+        for card in cards:
+            self.write(card)
+
+    def flush(self):
+        """Writes buffered cards and makes them durable."""
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self._buffer.clear()
+            self._sync()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Flushes and, in overwrite mode, atomically replaces the output with the new deck."""
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        if self._target != self.path:
+            os.replace(self._target, self.path)
+
+    def discard(self):
+        """Closes without touching the output: in overwrite mode the new deck is deleted, appended rows stay."""
+        if self._file.closed:
+            return
+        if self._target == self.path:
+            self.close() # Append mode: rows written so far are complete, keep them
+            return
+        self._buffer.clear()
+        self._file.close()
+        os.remove(self._target)
+        logger.warning(f"Run interrupted, {self.path} left unchanged.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
@@ -0,0 +1,221 @@
+import logging
+import threading
+from array import array
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+CARD_FIELDS = ["Front", "Back", "Tags"]
+DEFAULT_TAGS = "suomi-scraper"
+# Translator results that mean "no usable translation"
+ERROR_TRANSLATIONS = ("[No translation found]", "[Not Found]", "[Error]", "")
+ALIGNED = "aligned" # Provenance of glosses derived by src.sentence_gloss
+
+class CardBuilder:
+    """
+    Turns lemmas into Anki cards: skips short and already seen lemmas, translates,
+    and drops words whose translation failed or is identical (English/untranslated).
+    examples, if given, maps a lemma to an example sentence (or None) for an 'Example' field.
+    glosses (e.g. a sentence_gloss.GlossStore) holds derived glosses, used for words the
+    translator hasn't cached instead of translating them (Provenance 'aligned').
+    """
+    def __init__(self, translator, no_translate: bool = False, filter_untranslated: bool = True,
+                 seen: set = None, tags: str = DEFAULT_TAGS, examples=None, glosses=None):
+        self.translator = translator
+        self.no_translate = no_translate
+        self.filter_untranslated = filter_untranslated
+        self.seen = seen if seen is not None else set()
+        self.tags = tags
+        self.examples = examples
+        self.glosses = glosses
+        self._fetched = {} # lemma -> provenance of translations fetched ahead of build() (translate_ahead)
+
+    def wants(self, lemma: str) -> bool:
+        """True if build() would consider the lemma (long enough and not seen yet)."""
+        return len(lemma) >= 2 and lemma not in self.seen
+
+    def unseen(self, lemma_lists) -> list[str]:
+        """The distinct lemmas build_many() would translate, in order of appearance."""
+        return list(dict.fromkeys(lemma for lemmas in lemma_lists for lemma in lemmas if self.wants(lemma)))
+
+    def _translate(self, lemma: str) -> tuple[str, str]:
+        if self.glosses is not None and lemma in self.glosses:
+            cache = getattr(self.translator, "cache", None)
+            if cache is None or lemma.strip().lower() not in cache: # A real translation wins
+                return self.glosses.get(lemma), ALIGNED
+        if hasattr(self.translator, "translate_with_provenance"):
+            return self.translator.translate_with_provenance(lemma)
+        return self.translator.translate(lemma), "remote"
+
+    def translate_ahead(self, lemma: str) -> str:
+        """
+        Translates lemma before its card is built (e.g. on a worker thread), remembering
+        where the translation came from: build() then finds it cached but still reports
+        the original provenance.
+        """
+        translation, provenance = self._translate(lemma)
+        if provenance not in ("cache", "error", ALIGNED):
+            self._fetched[lemma] = provenance
+        return translation
+
+    def build(self, lemma: str, source: str = None):
+        """
+        Returns a card dict for the lemma, or None if it is skipped.
+        Besides the deck columns, cards carry 'Source' (where the lemma was first seen)
+        and 'Provenance' (where the translation came from) for columnar exports.
+        """
+        # Skip short words or unwanted
+        if not self.wants(lemma):
+            return None
+        self.seen.add(lemma)
+
+        if not self.no_translate:
+            translation, provenance = self._translate(lemma)
+            if provenance == "cache":
+                provenance = self._fetched.pop(lemma, provenance)
+
+            # Filter: Identical (English or Failed)
+            if self.filter_untranslated and translation.lower() == lemma.lower():
+                logger.info(f"Skipping {lemma} (translation identical/English)")
+                return None
+        else:
+            translation, provenance = "[SKIPPED]", "skipped"
+
+        # Filter: Explicit Errors
+        if self.filter_untranslated and translation in ERROR_TRANSLATIONS:
+            logger.info(f"Skipping {lemma} (no translation found)")
+            return None
+
+        card = {
+            "Front": lemma,
+            "Back": translation,
+            "Tags": self.tags,
+            "Source": source,
+            "Provenance": provenance,
+        }
+        if self.examples is not None:
+            card["Example"] = self.examples(lemma) or ""
+        return card
+
+    def build_many(self, lemma_lists, source: str = None) -> list[dict]:
+        """Builds cards for lemma lists as returned by VoikkoProcessor.lemmatize_many()."""
+        cards = []
+        for lemmas in lemma_lists:
+            for lemma in lemmas:
+                card = self.build(lemma, source)
+                if card:
+                    cards.append(card)
+        return cards
+
+class LemmaStats:
+    """Per-lemma run statistics: occurrences, number of sources and first source."""
+    def __init__(self):
+        self.frequencies = Counter()
+        self.documents = Counter()
+        self.first_sources = {}
+        self._source = None
+        self._source_lemmas = set()
+
+    def observe(self, lemmas: list[str], source: str = None):
+        """Counts the lemmas of one sentence. Sentences of a source are expected to arrive together."""
+        if source != self._source:
+            self._source = source
+            self._source_lemmas = set()
+        self.frequencies.update(lemmas)
+        for lemma in lemmas:
+            if lemma not in self._source_lemmas:
+                self._source_lemmas.add(lemma)
+                self.documents[lemma] += 1
+                self.first_sources.setdefault(lemma, source)
+
+class CardBuffer:
+    """
+    Column-oriented store for a session's cards: Front and Back in two lists, Tags as
+    indexes into a small table of interned tag strings, plus a lemma -> row index that
+    is also the dedup set (lemmas seen without producing a card map to -1).
+    Thread-safe, so a job can append while the GUI reads.
+    """
+    def __init__(self, cards=None):
+        self.fronts = []
+        self.backs = []
+        self.tag_ids = array("I")
+        self.tags = [] # Interned tag strings; tag_ids index into this
+        self._tag_index = {}
+        self._rows = {} # lemma -> row, or -1 if seen without a card
+        self._lock = threading.Lock()
+        self._frame = None # Cached DataFrame and the row count it was built for
+        self._frame_rows = -1
+        if cards:
+            self.extend(cards)
+
+    def __len__(self):
+        return len(self.fronts)
+
+    def __contains__(self, lemma: str) -> bool:
+        return lemma in self._rows
+
+    def _tag_id(self, tag: str) -> int:
+        tag_id = self._tag_index.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_index[tag] = len(self.tags)
+            self.tags.append(tag)
+        return tag_id
+
+    def extend(self, cards) -> int:
+        """Appends cards (dicts with Front/Back/Tags) whose Front isn't known yet. Returns how many were added."""
+        added = 0
+        with self._lock:
+            for card in cards:
+                front = card["Front"]
+                if self._rows.get(front, -1) != -1:
+                    continue
+                self._rows[front] = len(self.fronts)
+                self.fronts.append(front)
+                self.backs.append(card["Back"])
+                self.tag_ids.append(self._tag_id(card.get("Tags") or ""))
+                added += 1
+        return added
+
+    def mark_seen(self, lemmas):
+        """Records lemmas that were considered, so they're skipped later even without a card."""
+        with self._lock:
+            for lemma in lemmas:
+                self._rows.setdefault(lemma, -1)
+
+    def seen(self) -> set:
+        """A copy of the dedup set, e.g. to seed a CardBuilder."""
+        with self._lock:
+            return set(self._rows)
+
+    def get(self, lemma: str):
+        """The card for lemma as a dict, or None."""
+        with self._lock:
+            row = self._rows.get(lemma, -1)
+            if row == -1:
+                return None
+            return {"Front": self.fronts[row], "Back": self.backs[row], "Tags": self.tags[self.tag_ids[row]]}
+
+    def __iter__(self):
+        """Yields the cards as dicts (from a snapshot of the current rows)."""
+        with self._lock:
+            n = len(self.fronts)
+        for row in range(n):
+            yield {"Front": self.fronts[row], "Back": self.backs[row], "Tags": self.tags[self.tag_ids[row]]}
+
+    def to_dataframe(self):
+        """
+        The cards as a DataFrame (Tags as a categorical over the interned tags). The frame
+        is cached and only rebuilt once cards were added, so GUI reruns don't re-copy it.
+        Don't modify the returned frame in place.
+        """
+        import pandas as pd
+        with self._lock:
+            n = len(self.fronts)
+            if self._frame is None or self._frame_rows != n:
+                self._frame = pd.DataFrame({
+                    "Front": self.fronts[:n],
+                    "Back": self.backs[:n],
+                    "Tags": pd.Categorical.from_codes(self.tag_ids[:n].tolist(), categories=list(self.tags)),
+                })
+                self._frame_rows = n
+            return self._frame
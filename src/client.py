@@ -0,0 +1,125 @@
+import os
+import json
+import socket
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SERVER_ENV = "SUOMI_SERVER"
+TOKEN_ENV = "SUOMI_TOKEN"
+
+# http.client is imported on first use: main.py imports this module for the constants above
+_unix_connection_class = None
+
+def _unix_connection(socket_path: str, timeout: float):
+    global _unix_connection_class
+    if _unix_connection_class is None:
+        import http.client
+
+        class _UnixHTTPConnection(http.client.HTTPConnection):
+            def __init__(self, socket_path: str, timeout: float):
+                super().__init__("localhost", timeout=timeout)
+                self.socket_path = socket_path
+
+            def connect(self):
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.settimeout(self.timeout)
+                self.sock.connect(self.socket_path)
+
+        _unix_connection_class = _UnixHTTPConnection
+    return _unix_connection_class(socket_path, timeout)
+
+class ServiceClient:
+    """
+    Thin client for the daemon in src/server.py. Offers the same methods the CLI and GUI
+    use on VoikkoProcessor and TranslatorService, so it can stand in for both.
+    Args:
+        address: "unix:/path/to/socket", "http://host:port" or "host:port".
+        token: Shared secret the server was started with (default: $SUOMI_TOKEN).
+    """
+    def __init__(self, address: str, timeout: float = 300, token: str = None):
+        self.address = address
+        self.timeout = timeout
+        self.token = token if token is not None else os.environ.get(TOKEN_ENV)
+        self._local = threading.local() # One keep-alive connection per thread
+        self._translations = {} # Results of translate_many(), so translate() of those words needs no round trip
+
+    def _connect(self):
+        import http.client
+        if self.address.startswith("unix:"):
+            return _unix_connection(self.address[len("unix:"):], self.timeout)
+        host = self.address.split("://", 1)[-1].rstrip("/")
+        return http.client.HTTPConnection(host, timeout=self.timeout)
+
+    def _call(self, path: str, payload: dict = None) -> dict:
+        import http.client
+        body = json.dumps(payload or {}, ensure_ascii=False).encode('utf-8')
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = self._connect()
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = json.loads(resp.read() or b"{}")
+                break
+            except (ConnectionError, http.client.HTTPException) as e:
+                # The server closed the kept-alive connection; retry once on a new one
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+                logger.debug(f"Reconnecting to {self.address}: {e}")
+
+        if resp.status != 200:
+            raise RuntimeError(f"Server error on {path} ({resp.status}): {data.get('error')}")
+        return data
+
+    # --- VoikkoProcessor interface ---
+
+    def lemmatize_many(self, sentences: list[str], strict: bool = True) -> list[list[str]]:
+        return self._call("/lemmatize", {"sentences": sentences, "strict": strict})["lemmas"]
+
+    def lemmatize(self, text: str, strict: bool = True) -> list[str]:
+        return self.lemmatize_many([text], strict)[0]
+
+    def split_many(self, segments: list[str]) -> list[str]:
+        return self._call("/sentences", {"segments": segments})["sentences"]
+
+    def split_sentences(self, text: str) -> list[str]:
+        return self.split_many([text])
+
+    # --- TranslatorService interface ---
+
+    def translate_many(self, words: list[str]) -> dict:
+        """Translates words in one round trip (e.g. all new words of an item)."""
+        translations = self._call("/translate", {"words": list(words)})["translations"]
+        self._translations.update(translations)
+        return translations
+
+    def translate(self, word: str) -> str:
+        if word in self._translations:
+            return self._translations[word]
+        return self.translate_many([word])[word]
+
+    def query_cache(self, search: str = "", offset: int = 0, limit: int = 50) -> tuple[list[dict], int]:
+        data = self._call("/vocab", {"search": search, "offset": offset, "limit": limit})
+        return data["rows"], data["total"]
+
+    def clear_cache(self):
+        self._call("/clear_cache")
+        self._translations.clear()
+
+    # --- Card building ---
+
+    def build_cards(self, sentences: list[str], seen: list[str] = (), **options) -> list[dict]:
+        """Lemmatizes, translates and filters in one round trip. options as in CardBuilder (and strict)."""
+        payload = dict(options, sentences=sentences, seen=list(seen))
+        return self._call("/cards", payload)["cards"]
+
+    def health(self) -> dict:
+        return self._call("/health")
@@ -0,0 +1,108 @@
+import os
+import logging
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Low-cardinality columns (tags, source URLs, provenance) are dictionary-encoded
+DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+
+CARD_SCHEMA = pa.schema([
+    ("Front", pa.string()),
+    ("Back", pa.string()),
+    ("Tags", DICT_STRING),
+    ("Source", DICT_STRING),
+    ("Provenance", DICT_STRING),
+    ("Example", pa.string()), # Only with --example-field
+])
+
+VOCAB_SCHEMA = pa.schema([
+    ("Finnish", pa.string()),
+    ("English", pa.string()),
+])
+
+LEMMA_STATS_SCHEMA = pa.schema([
+    ("Lemma", pa.string()),
+    ("Frequency", pa.int64()),
+    ("Documents", pa.int32()),
+    ("FirstSource", DICT_STRING),
+])
+
+class ParquetRecordWriter:
+    """
+    Streams dict rows into a Parquet file in record batches of batch_size rows.
+    Rows are written to a temp file that replaces the output on close(), so a crashed
+    run never leaves a truncated (unreadable) Parquet file behind.
+    """
+    def __init__(self, path: str, schema: pa.Schema, batch_size: int = 10000, compression: str = "zstd"):
+        self.path = path
+        self.schema = schema
+        self.batch_size = batch_size
+        self.count = 0
+        self._columns = {name: [] for name in schema.names}
+        self._tmp = os.path.join(os.path.dirname(os.path.abspath(path)), f".{os.path.basename(path)}.tmp")
+        self._writer = pq.ParquetWriter(self._tmp, schema, compression=compression, use_dictionary=True)
+
+    def write(self, row: dict):
+        for name, values in self._columns.items():
+            values.append(row.get(name))
+        self.count += 1
+        if len(self._columns[self.schema.names[0]]) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if not self._columns[self.schema.names[0]]:
+            return
+        arrays = []
+        for field in self.schema:
+            values = self._columns[field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=field.type.value_type).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+            values.clear()
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        if self._writer is None:
+            return
+        self.flush()
+        self._writer.close()
+        self._writer = None
+        os.replace(self._tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+class ParquetCardSink(ParquetRecordWriter):
+    """Card sink (same interface as CsvCardSink) writing Front/Back/Tags plus Source, Provenance and Example."""
+    def __init__(self, path: str, batch_size: int = 10000):
+        super().__init__(path, CARD_SCHEMA, batch_size)
+
+def write_vocab(path: str, rows, batch_size: int = 10000) -> int:
+    """Streams vocabulary rows ({'Finnish', 'English'}) into a Parquet file. Returns the row count."""
+    with ParquetRecordWriter(path, VOCAB_SCHEMA, batch_size) as writer:
+        writer.write_many(rows)
+    return writer.count
+
+def write_lemma_stats(path: str, stats) -> int:
+    """Writes per-lemma run statistics (a cards.LemmaStats), most frequent first."""
+    with ParquetRecordWriter(path, LEMMA_STATS_SCHEMA) as writer:
+        for lemma, freq in stats.frequencies.most_common():
+            writer.write({
+                "Lemma": lemma,
+                "Frequency": freq,
+                "Documents": stats.documents[lemma],
+                "FirstSource": stats.first_sources.get(lemma),
+            })
+    return writer.count
@@ -0,0 +1,225 @@
+import re
+import logging
+from urllib.parse import urlparse
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Text-bearing blocks we emit (same set the old find_all() used)
+BLOCK_TAGS = frozenset(["h1", "h2", "h3", "p"])
+# Subtrees that never hold article text; skipped without being walked
+# (<header> is kept: articles often put their headline in one)
+SKIP_TAGS = frozenset(["script", "style", "noscript", "template", "svg", "nav", "footer",
+                       "aside", "form", "button", "iframe", "figure"])
+# Tags the old find_all() fallback removed before collecting blocks
+FALLBACK_SKIP_TAGS = frozenset(["script", "style", "nav", "footer", "header", "aside"])
+# class/id hints for comment sections, teasers, share bars, etc. They are matched against
+# whole words of the class tokens and id ("article-comments" -> "article", "comments"),
+# so "commentary" or "promo-free" don't count
+NEGATIVE_HINTS = re.compile(
+    r"comments?|kommentit|kommentti|teasers?|related|recommend(ed|ations?)?|suositellut|suositut|"
+    r"share|sharing|jaa|social|promo|promotion|advert(isement)?|ads?|mainos|newsletter|banner|"
+    r"cookies?|consent|paywall|sidebar|byline|caption|breadcrumbs?|tags",
+    re.I
+)
+POSITIVE_HINTS = re.compile(r"article|content|story|body|text|main|artikkeli|uutinen", re.I)
+HINT_WORD_SEPARATORS = re.compile(r"[-_]")
+# Page-level containers are never boilerplate, whatever their class says
+NEVER_HINTED_TAGS = frozenset(["html", "body", "main", "article"])
+
+MIN_BLOCK_CHARS = 25 # Shorter paragraphs don't vote for a container (bylines, dates, labels)
+MAX_LINK_DENSITY = 0.5 # Blocks that are mostly link text are navigation/teasers
+MIN_ARTICLE_CHARS = 200 # Below this the scored candidate isn't trusted; fall back to all blocks
+
+class SiteProfile:
+    """
+    XPath selectors for sites we scrape a lot. The first content selector that matches
+    is used as the article root; drop selectors remove elements inside it.
+    When streaming, nothing after the closing stop_tag is needed, so reading stops there.
+    """
+    def __init__(self, content: list[str], drop: list[str] = (), stop_tag: str = None):
+        self.content = content
+        self.drop = list(drop)
+        self.stop_tag = stop_tag
+
+SITE_PROFILES = {
+    "yle.fi": SiteProfile(
+        content=["//main//article", "//article"],
+        drop=[".//*[contains(@class, 'yle__article__related')]", ".//*[contains(@class, 'comments')]"],
+        stop_tag="main",
+    ),
+    "hs.fi": SiteProfile(
+        content=["//article[contains(@class, 'article')]", "//main//article", "//article"],
+        drop=[".//*[contains(@class, 'paywall')]", ".//*[contains(@class, 'teaser')]",
+              ".//*[contains(@class, 'article-info')]"],
+        stop_tag="main",
+    ),
+}
+
+def get_profile(url: str):
+    """Returns the SiteProfile for the URL's host or one of its parent domains."""
+    host = urlparse(url).netloc.lower().split(":")[0]
+    while host:
+        if host in SITE_PROFILES:
+            return SITE_PROFILES[host]
+        _, _, host = host.partition(".")
+    return None
+
+def stop_condition(url: str):
+    """Returns a stop(element) predicate for http_client.stream_html(), or None."""
+    profile = get_profile(url)
+    if profile is None or profile.stop_tag is None:
+        return None
+    return lambda element: element.tag == profile.stop_tag
+
+def _clean(text: str) -> str:
+    return " ".join(text.split())
+
+def _hinted(el, pattern) -> bool:
+    if el.tag in NEVER_HINTED_TAGS:
+        return False
+    for token in (el.get("class") or "").split() + [el.get("id") or ""]:
+        if any(pattern.fullmatch(word) for word in HINT_WORD_SEPARATORS.split(token) if word):
+            return True
+    return False
+
+def _link_chars(el) -> int:
+    return sum(len(_clean(a.text_content())) for a in el.iter("a"))
+
+class _Block:
+    __slots__ = ("element", "text", "link_density", "hinted")
+
+    def __init__(self, element, text, link_density, hinted):
+        self.element = element
+        self.text = text
+        self.link_density = link_density
+        self.hinted = hinted # Negatively hinted containers the block sits in
+
+    def boilerplate_in(self, root) -> bool:
+        """True if one of the block's hinted containers lies within root (or is root)."""
+        return any(h is root or _within(h, root) for h in self.hinted)
+
+def _walk(root):
+    """
+    One walk over the tree: skips boilerplate tags, collects text blocks in document
+    order and scores their parent (and, at half weight, grandparent) containers by
+    text length and link density. Returns (blocks, scores).
+    Negatively hinted containers aren't skipped here, only noted on their blocks: whether
+    they are boilerplate depends on where the chosen article root is.
+    """
+    blocks = []
+    scores = {}
+    hinted = [] # Open negatively hinted containers
+    walker = etree.iterwalk(root, events=("start", "end"))
+    for event, el in walker:
+        tag = el.tag
+        if not isinstance(tag, str): # Comments, processing instructions
+            if event == "start":
+                walker.skip_subtree()
+            continue
+        if event == "start":
+            if tag in SKIP_TAGS:
+                walker.skip_subtree()
+            elif tag not in BLOCK_TAGS and _hinted(el, NEGATIVE_HINTS):
+                hinted.append(el)
+            continue
+        if hinted and hinted[-1] is el:
+            hinted.pop()
+            continue
+        if tag not in BLOCK_TAGS:
+            continue
+
+        text = _clean(el.text_content())
+        if not text:
+            continue
+        link_density = _link_chars(el) / len(text)
+        blocks.append(_Block(el, text, link_density, tuple(hinted)))
+
+        if tag != "p" or len(text) < MIN_BLOCK_CHARS or link_density > MAX_LINK_DENSITY:
+            continue
+        # Longer paragraphs and commas (running prose) count more; links count against
+        score = (1 + text.count(",") + min(len(text) // 100, 3)) * (1 - link_density)
+        parent = el.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0.0) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0.0) + score / 2
+    return blocks, scores
+
+def _best_candidate(scores):
+    best, best_score = None, 0.0
+    for el, score in scores.items():
+        if _hinted(el, POSITIVE_HINTS):
+            score *= 1.25
+        if _hinted(el, NEGATIVE_HINTS):
+            score *= 0.25
+        if score > best_score:
+            best, best_score = el, score
+    return best
+
+def _within(el, root) -> bool:
+    return any(ancestor is root for ancestor in el.iterancestors())
+
+def _all_blocks(doc) -> list[str]:
+    """Every heading and paragraph outside FALLBACK_SKIP_TAGS, in document order (the old find_all() path)."""
+    texts = []
+    for el in doc.iter("h1", "h2", "h3", "p"):
+        if any(ancestor.tag in FALLBACK_SKIP_TAGS for ancestor in el.iterancestors()):
+            continue
+        text = _clean(el.text_content())
+        if text:
+            texts.append(text)
+    return texts
+
+def extract_from_tree(doc, url: str = "") -> str:
+    """
+    Readability-style main content extraction from a parsed lxml.html document. Returns
+    the page title plus the headings and paragraphs of the article body, one per line.
+
+    Site profiles (SITE_PROFILES) pick the article root directly; otherwise the container
+    with the best text/link density score is used. Inside the root, blocks in negatively
+    hinted containers (comments, teasers, ...) are left out. If this doesn't yield a
+    plausible article (MIN_ARTICLE_CHARS), every heading and paragraph of the page is
+    returned, as before content extraction. Note that site profile drop selectors modify the tree.
+    """
+    title = doc.find(".//title")
+    title_text = _clean(title.text_content()) if title is not None else ""
+
+    root = None
+    profile = get_profile(url) if url else None
+    if profile:
+        for selector in profile.content:
+            matches = doc.xpath(selector)
+            if matches:
+                root = matches[0]
+                for drop in profile.drop:
+                    for el in root.xpath(drop):
+                        el.drop_tree()
+                break
+
+    blocks, scores = _walk(root if root is not None else doc)
+    article = []
+    if root is None:
+        best = _best_candidate(scores)
+        if best is not None:
+            article = [b for b in blocks if b.link_density <= MAX_LINK_DENSITY and _within(b.element, best)
+                       and not b.boilerplate_in(best)]
+            # Keep the headline even if it sits outside the body container
+            headline = next((b for b in blocks if b.element.tag == "h1"), None)
+            if article and headline is not None and headline not in article:
+                article.insert(0, headline)
+    else:
+        article = [b for b in blocks if b.link_density <= MAX_LINK_DENSITY and not b.boilerplate_in(root)]
+
+    if sum(len(b.text) for b in article) >= MIN_ARTICLE_CHARS:
+        texts = [b.text for b in article]
+    else:
+        logger.info(f"No clear article body in {url}, using all paragraphs.")
+        texts = _all_blocks(doc)
+
+    text_blocks = [title_text] if title_text else []
+    text_blocks.extend(t for t in texts if t != title_text)
+    return "\n".join(text_blocks)
@@ -0,0 +1,152 @@
+import os
+import zlib
+import hashlib
+import time
+import sqlite3
+import logging
+import threading
+
+from src import registry
+from src.folder_watch import file_hash
+from src.pipeline import Stage
+
+logger = logging.getLogger(__name__)
+
+SHARD_BYTES = 64 * 1024 * 1024 # A new shard file is started once the current one is this large
+INDEX_FILE = "index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    segments INTEGER NOT NULL,
+    stored REAL,
+    digest TEXT
+);
+CREATE INDEX IF NOT EXISTS records_source ON records(source, stored);
+"""
+# Columns added after the first release, for archives created by older versions
+MIGRATIONS = {
+    "digest": "ALTER TABLE records ADD COLUMN digest TEXT",
+}
+
+def source_key(source: str) -> str:
+    """Archive key of a source: the URL, or for a local document its content hash."""
+    if registry.is_document(source):
+        return "sha256:" + file_hash(source)
+    return source
+
+class CorpusArchive:
+    """
+    Archive of extracted segments per source (URL or document), so decks can be rebuilt
+    with other filters without fetching or parsing again. Each source's segments are one
+    zlib-compressed record appended to the current shard (shard-NNNN.z in directory);
+    index.db maps the source key to (shard, offset, length). Re-archiving a source with
+    changed segments appends a new record and repoints the index (the old bytes are simply
+    unused); unchanged segments, recognized by their hash, aren't written again.
+    Thread-safe: the loading stage may read on several threads.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(records)")}
+        with self.conn:
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    self.conn.execute(statement)
+        self._lock = threading.Lock()
+        row = self.conn.execute("SELECT MAX(shard) FROM records").fetchone()
+        self._shard = row[0] or 0
+
+    def close(self):
+        self.conn.close()
+
+    def _shard_path(self, shard: int) -> str:
+        return os.path.join(self.directory, f"shard-{shard:04d}.z")
+
+    def add(self, source: str, segments: list[str], key: str = None):
+        """
+        Stores the segments of one source (key defaults to source_key(source)). Segments
+        identical to the stored record aren't written again, only its source and time are updated.
+        """
+        key = key or source_key(source)
+        raw = "\n".join(s.replace("\n", " ") for s in segments).encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        with self._lock:
+            row = self.conn.execute("SELECT digest FROM records WHERE key = ?", (key,)).fetchone()
+            if row and row[0] == digest:
+                with self.conn:
+                    self.conn.execute("UPDATE records SET source = ?, stored = ? WHERE key = ?", (source, time.time(), key))
+                return
+        data = zlib.compress(raw)
+        with self._lock:
+            path = self._shard_path(self._shard)
+            if os.path.exists(path) and os.path.getsize(path) >= SHARD_BYTES:
+                self._shard += 1
+                path = self._shard_path(self._shard)
+            # The record is on disk before the index points at it
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO records (key, source, shard, offset, length, segments, stored, digest) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, source, self._shard, offset, len(data), len(segments), time.time(), digest)
+                )
+
+    def _locate(self, source: str):
+        # A document is found by its current content if archived, else by its latest record
+        key = source_key(source) if registry.is_document(source) else None
+        with self._lock:
+            if key is not None:
+                row = self.conn.execute("SELECT shard, offset, length FROM records WHERE key = ?", (key,)).fetchone()
+                if row:
+                    return row
+            return self.conn.execute(
+                "SELECT shard, offset, length FROM records WHERE source = ? ORDER BY stored DESC LIMIT 1", (source,)
+            ).fetchone()
+
+    def load(self, source: str) -> list[str]:
+        """The archived segments of source. Raises LookupError if it was never archived."""
+        row = self._locate(source)
+        if row is None:
+            raise LookupError(f"{source} is not in the archive {self.directory}")
+        shard, offset, length = row
+        with open(self._shard_path(shard), "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        text = zlib.decompress(data).decode("utf-8")
+        return text.split("\n") if text else []
+
+    def sources(self) -> list[str]:
+        """All archived sources, in the order they were first archived."""
+        with self._lock:
+            rows = self.conn.execute("SELECT source FROM records GROUP BY source ORDER BY MIN(stored)").fetchall()
+        return [row[0] for row in rows]
+
+    def counts(self) -> dict:
+        with self._lock:
+            sources, segments = self.conn.execute(
+                "SELECT COUNT(DISTINCT source), COALESCE(SUM(segments), 0) FROM records"
+            ).fetchone()
+        size = sum(os.path.getsize(self._shard_path(shard)) for shard in range(self._shard + 1)
+                   if os.path.exists(self._shard_path(shard)))
+        return {"sources": sources, "segments": segments, "shards": self._shard + 1, "bytes": size}
+
+class ArchiveRecorder(Stage):
+    """Pipeline stage (after loading) that archives each item's extracted segments."""
+    def __init__(self, archive: CorpusArchive):
+        super().__init__("archive", self._record, 1)
+        self.archive = archive
+
+    def _record(self, item):
+        self.archive.add(item.item, item.segments)
@@ -1,27 +1,24 @@
 import requests
-from bs4 import BeautifulSoup
 import logging
-import time
 from urllib.parse import urljoin
 
+from src import http_client
+
 logger = logging.getLogger(__name__)
 
 class LDSCrawler:
     def __init__(self):
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.session.headers.update({'User-Agent': http_client.USER_AGENT})
         self.visited = set()
 
-    def get_soup(self, url):
-        time.sleep(0.3) # Fast but polite
+    def get_tree(self, url):
         try:
-            resp = self.session.get(url, timeout=10)
-            if resp.status_code != 200:
-                logger.warning(f"Failed to fetch {url}: Status {resp.status_code}")
-                return None
-            return BeautifulSoup(resp.content, 'lxml')
+            # Paced by the shared per-host rate controller, parsed while streaming
+            return http_client.stream_html(url, session=self.session)
+        except requests.HTTPError as e:
+            logger.warning(f"Failed to fetch {url}: Status {e.response.status_code}")
+            return None
         except Exception as e:
             logger.error(f"Error crawling {url}: {e}")
             return None
@@ -66,13 +63,13 @@ class LDSCrawler:
             self.visited.add(current_url)
             
             logger.info(f"Scanning: {current_url}")
-            soup = self.get_soup(current_url)
-            if not soup:
+            tree = self.get_tree(current_url)
+            if tree is None:
                 continue
                 
-            links = soup.find_all('a', href=True)
+            links = tree.xpath('//a[@href]')
             for a in links:
-                href = a['href']
+                href = a.get('href')
                 
                 # Convert relative to absolute
                 full_url = urljoin(current_url, href)
@@ -0,0 +1,101 @@
+import io
+import csv
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _open_text(source):
+    """Opens a deck path or file-like object (text or bytes, e.g. a Streamlit upload) for csv."""
+    if isinstance(source, str):
+        return open(source, 'r', newline='', encoding='utf-8-sig')
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+
+def _iter_deck(source, delimiter=';'):
+    """Yields rows of a deck path/file, or passes through an iterable of card dicts."""
+    if isinstance(source, str) or hasattr(source, 'read'):
+        f = _open_text(source)
+        try:
+            reader = csv.DictReader(f, delimiter=delimiter)
+            yield from reader
+        finally:
+            if isinstance(source, str):
+                f.close()
+            elif isinstance(f, io.TextIOWrapper) and f is not source:
+                f.detach() # Leave the caller's binary file open
+    else:
+        yield from source
+
+def _read_header(source, delimiter=';') -> list[str]:
+    if isinstance(source, str) or hasattr(source, 'read'):
+        f = _open_text(source)
+        try:
+            return next(csv.reader(f, delimiter=delimiter), [])
+        finally:
+            if isinstance(source, str):
+                f.close()
+            elif isinstance(f, io.TextIOWrapper) and f is not source:
+                f.detach()
+    for card in source:
+        return list(card.keys())
+    return []
+
+def deck_fronts(source, delimiter=';') -> set:
+    """The words (Front column) of a deck path or file."""
+    return {row["Front"] for row in _iter_deck(source, delimiter) if row.get("Front")}
+
+def merge_decks(existing, new_cards, output, delimiter=';') -> dict:
+    """
+    Merges new cards into an existing deck, streaming rows instead of loading both
+    decks into memory. Only the 'Front' keys of the new cards are indexed.
+
+    Like the old concat + drop_duplicates(keep='last'), a new card replaces an existing
+    card with the same Front. Existing cards keep their order and the new cards follow.
+
+    Args:
+        existing: Path or file-like object of the existing deck (semicolon CSV).
+        new_cards: Path, file-like object, or a re-iterable of card dicts (e.g. a list).
+        output: Path or writable text file the merged deck is written to progressively.
+    Returns:
+        dict: Counts of existing, replaced, new and total cards.
+    """
+    # 1. Index the keys of the new side
+    new_keys = set()
+    for card in _iter_deck(new_cards, delimiter):
+        new_keys.add(card.get("Front"))
+
+    # Header: existing columns first, then any extra columns the new cards carry
+    fieldnames = _read_header(existing, delimiter) or ["Front", "Back", "Tags"]
+    for name in _read_header(new_cards, delimiter):
+        if name not in fieldnames:
+            fieldnames.append(name)
+
+    out = open(output, 'w', newline='', encoding='utf-8') if isinstance(output, str) else output
+    stats = {"existing": 0, "replaced": 0, "new": 0, "total": 0}
+    try:
+        writer = csv.DictWriter(out, fieldnames=fieldnames, delimiter=';', restval='', extrasaction='ignore')
+        writer.writeheader()
+
+        # 2. Stream the existing deck, dropping cards that the new side replaces
+        for row in _iter_deck(existing, delimiter):
+            stats["existing"] += 1
+            if row.get("Front") in new_keys:
+                stats["replaced"] += 1
+                continue
+            writer.writerow(row)
+            stats["total"] += 1
+
+        # 3. Stream the new cards
+        for card in _iter_deck(new_cards, delimiter):
+            writer.writerow(card)
+            stats["new"] += 1
+            stats["total"] += 1
+    finally:
+        if isinstance(output, str):
+            out.close()
+
+    logger.info(f"Merged {stats['new']} new cards into {stats['existing']} existing ({stats['replaced']} replaced). Total: {stats['total']}")
+    return stats
@@ -0,0 +1,242 @@
+import gzip
+import time
+import sqlite3
+import hashlib
+import logging
+
+from lxml import etree
+
+from src import http_client
+from src.pipeline import Stage
+
+logger = logging.getLogger(__name__)
+
+# Shorthands accepted by --discover
+DEFAULT_FEEDS = {
+    "yle": ["https://yle.fi/rss/uutiset/paauutiset", "https://yle.fi/rss/uutiset/tuoreimmat"],
+    "hs": ["https://www.hs.fi/rss/tuoreimmat.xml"],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    lastmod TEXT,
+    checked REAL
+);
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    lastmod TEXT,
+    content_hash TEXT,
+    processed REAL,
+    pending_since REAL,
+    pending_lastmod TEXT
+);
+"""
+# Columns added after the first release, for indexes created by older versions
+MIGRATIONS = {
+    "pending_since": "ALTER TABLE articles ADD COLUMN pending_since REAL",
+    "pending_lastmod": "ALTER TABLE articles ADD COLUMN pending_lastmod TEXT",
+}
+
+def expand_feeds(names: list[str]) -> list[str]:
+    """Turns site shorthands ('yle', 'hs') into their feed URLs; URLs pass through."""
+    if not names:
+        names = list(DEFAULT_FEEDS)
+    feeds = []
+    for name in names:
+        feeds.extend(DEFAULT_FEEDS.get(name, [name]))
+    return feeds
+
+def content_hash(segments: list[str]) -> str:
+    return hashlib.sha256("\n".join(segments).encode("utf-8")).hexdigest()
+
+def _localname(el) -> str:
+    return etree.QName(el).localname
+
+def _child_text(el, name: str):
+    for child in el:
+        if isinstance(child.tag, str) and _localname(child) == name:
+            return (child.text or "").strip() or None
+    return None
+
+def parse_feed(data: bytes):
+    """
+    Parses an RSS, Atom or sitemap document. Returns (articles, sitemaps): lists of
+    (url, lastmod) where lastmod is None unless the document gives one.
+    """
+    if data[:2] == b"\x1f\x8b": # .xml.gz sitemaps are served as-is
+        data = gzip.decompress(data)
+    root = etree.fromstring(data, parser=etree.XMLParser(recover=True, resolve_entities=False, no_network=True))
+    articles, sitemaps = [], []
+    if root is None:
+        return articles, sitemaps
+    for el in root.iter():
+        if not isinstance(el.tag, str):
+            continue
+        name = _localname(el)
+        if name == "item": # RSS
+            link = _child_text(el, "link")
+            if link:
+                articles.append((link, None))
+        elif name == "entry": # Atom
+            for child in el:
+                if isinstance(child.tag, str) and _localname(child) == "link" and child.get("rel", "alternate") == "alternate":
+                    articles.append((child.get("href"), _child_text(el, "updated")))
+                    break
+        elif name == "url": # Sitemap
+            loc = _child_text(el, "loc")
+            if loc:
+                articles.append((loc, _child_text(el, "lastmod")))
+        elif name == "sitemap": # Sitemap index
+            loc = _child_text(el, "loc")
+            if loc:
+                sitemaps.append((loc, _child_text(el, "lastmod")))
+    return articles, sitemaps
+
+class DiscoveryIndex:
+    """
+    Persistent index (SQLite) for incremental runs: per feed the ETag/Last-Modified of
+    the last poll, per article the lastmod and content hash it was processed with.
+    Articles are recorded as pending as soon as a feed lists them and stay pending until
+    mark_processed(), so an interrupted run or a failed fetch doesn't lose them even
+    though their feed answers 304 next time.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        # Also used from the pipeline's filter stage thread (one at a time)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(articles)")}
+        with self.conn:
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    self.conn.execute(statement)
+
+    def close(self):
+        self.conn.close()
+
+    def _fetch(self, url: str):
+        """
+        Conditional GET. Returns the response, or None if the feed is unchanged. Its
+        validators are stored by _record() together with the articles it lists.
+        """
+        row = self.conn.execute("SELECT etag, last_modified FROM feeds WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if row:
+            if row[0]:
+                headers["If-None-Match"] = row[0]
+            if row[1]:
+                headers["If-Modified-Since"] = row[1]
+        response = http_client.get(url, headers=headers)
+        if response.status_code == 304:
+            logger.info(f"Unchanged: {url}")
+            return None
+        response.raise_for_status()
+        return response
+
+    def _record(self, feed: str, response, lastmod, articles: dict):
+        """
+        Stores the feed's validators (and sitemap lastmod) and its new or changed articles
+        as pending in one transaction: once the feed counts as polled, its articles are
+        safe until mark_processed().
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO feeds (url, etag, last_modified, checked) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified, checked = excluded.checked",
+                (feed, response.headers.get("ETag"), response.headers.get("Last-Modified"), now)
+            )
+            if lastmod is not None:
+                self.conn.execute("UPDATE feeds SET lastmod = ? WHERE url = ?", (lastmod, feed))
+            self.conn.executemany(
+                "INSERT INTO articles (url, pending_since, pending_lastmod) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET pending_since = COALESCE(pending_since, excluded.pending_since), "
+                "pending_lastmod = excluded.pending_lastmod",
+                ((url, now, article_lastmod) for url, article_lastmod in articles.items())
+            )
+
+    def _is_candidate(self, url: str, lastmod) -> bool:
+        row = self.conn.execute("SELECT lastmod FROM articles WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return True
+        # Known article: only worth re-reading if the sitemap/feed says it changed
+        return lastmod is not None and lastmod != row[0]
+
+    def discover(self, feeds: list[str]) -> list[tuple[str, str]]:
+        """
+        Polls the feeds (following sitemap indexes) and returns [(url, lastmod)] for
+        articles that are new or whose lastmod changed, in feed order, followed by those
+        found by earlier polls but not processed yet.
+        """
+        found = {}
+        queue = [(feed, None) for feed in feeds]
+        while queue:
+            feed, lastmod = queue.pop(0)
+            if lastmod is not None:
+                row = self.conn.execute("SELECT lastmod FROM feeds WHERE url = ?", (feed,)).fetchone()
+                if row and row[0] == lastmod:
+                    continue # Child sitemap unchanged according to its index
+            try:
+                response = self._fetch(feed)
+            except Exception as e:
+                logger.error(f"Error polling {feed}: {e}")
+                continue
+            if response is None:
+                continue
+            articles, sitemaps = parse_feed(response.content)
+            queue.extend(sitemaps)
+            new = {}
+            for url, article_lastmod in articles:
+                if url not in found and url not in new and self._is_candidate(url, article_lastmod):
+                    new[url] = article_lastmod
+            self._record(feed, response, lastmod, new)
+            found.update(new)
+            logger.info(f"{feed}: {len(articles)} articles, {len(new)} new or changed.")
+
+        leftover = 0
+        for url, lastmod in self.conn.execute(
+            "SELECT url, pending_lastmod FROM articles WHERE pending_since IS NOT NULL ORDER BY pending_since, url"
+        ):
+            if url not in found:
+                found[url] = lastmod
+                leftover += 1
+        if leftover:
+            logger.info(f"{leftover} articles from earlier polls are still unprocessed.")
+        return list(found.items())
+
+    def is_changed(self, url: str, digest: str) -> bool:
+        """True unless the article was already processed with this exact content."""
+        row = self.conn.execute("SELECT content_hash FROM articles WHERE url = ?", (url,)).fetchone()
+        return row is None or row[0] != digest
+
+    def mark_processed(self, entries):
+        """Records [(url, lastmod, content_hash)] whose cards have been written."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO articles (url, lastmod, content_hash, processed) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET lastmod = excluded.lastmod, content_hash = excluded.content_hash, "
+                "processed = excluded.processed, pending_since = NULL, pending_lastmod = NULL",
+                ((url, lastmod, digest, now) for url, lastmod, digest in entries)
+            )
+
+class UnchangedFilter(Stage):
+    """
+    Pipeline stage (after loading) that skips articles whose extracted content is the
+    same as when they were last processed. digests maps each checked URL to its hash.
+    """
+    def __init__(self, index: DiscoveryIndex):
+        super().__init__("discovery", self._check, 1)
+        self.index = index
+        self.digests = {}
+
+    def _check(self, item):
+        digest = content_hash(item.segments)
+        self.digests[item.item] = digest
+        if not self.index.is_changed(item.item, digest):
+            logger.info(f"{item.item}: content unchanged since last run, skipping.")
+            item.skipped = True
@@ -1,11 +1,62 @@
 import os
 import io
+import re
 import logging
-from pypdf import PdfReader
-from docx import Document
+import zipfile
 
 logger = logging.getLogger(__name__)
 
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+HEADER_PART = re.compile(r"word/header(\d*)\.xml$")
+
+def _iter_part_paragraphs(stream):
+    """
+    Iterparses one WordprocessingML part and yields the text of each paragraph (<w:p>),
+    including those in tables and text boxes, as soon as it is complete. Finished elements
+    are cleared, so memory doesn't grow with the document.
+    """
+    from lxml import etree # Imported lazily, only DOCX runs need it
+    P, T, TAB, BR, CR = (WORD_NS + name for name in ("p", "t", "tab", "br", "cr"))
+    parts = [] # Text of the open paragraphs (text boxes nest paragraphs inside paragraphs)
+    for event, el in etree.iterparse(stream, events=("start", "end"), tag=(P, T, TAB, BR, CR),
+                                     resolve_entities=False, no_network=True, huge_tree=True):
+        if event == "start":
+            if el.tag == P:
+                parts.append([])
+            continue
+        if el.tag == P:
+            yield "".join(parts.pop())
+            el.clear()
+            # Drop the already processed siblings too, not just their contents
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+        elif parts:
+            if el.tag == T:
+                parts[-1].append(el.text or "")
+            elif el.tag == TAB:
+                parts[-1].append("\t")
+            else:
+                parts[-1].append("\n") # Line break inside the paragraph, as python-docx reads it
+
+def iter_docx_paragraphs(file_obj):
+    """
+    Streams the paragraphs of a .docx (path or binary file object) straight from the zip,
+    without building a python-docx object model: first the headers (each distinct text
+    once), then the body, tables included. Yields one string per paragraph.
+    """
+    with zipfile.ZipFile(file_obj) as archive:
+        names = archive.namelist()
+        headers = sorted((int(m.group(1) or 0), name) for name in names if (m := HEADER_PART.match(name)))
+        seen = set()
+        for _, name in headers:
+            with archive.open(name) as stream:
+                for text in _iter_part_paragraphs(stream):
+                    if text.strip() and text not in seen:
+                        seen.add(text)
+                        yield text
+        with archive.open("word/document.xml") as stream:
+            yield from _iter_part_paragraphs(stream)
+
 class DocumentLoader:
     def load_file(self, file_obj, filename: str) -> str:
         """
@@ -34,6 +85,7 @@ class DocumentLoader:
 
     def _extract_pdf(self, file_obj) -> str:
         text = []
+        from pypdf import PdfReader # Imported lazily, only PDF runs need it
         try:
             reader = PdfReader(file_obj)
             for page in reader.pages:
@@ -44,15 +96,11 @@ class DocumentLoader:
         return "\n".join(text)
 
     def _extract_docx(self, file_obj) -> str:
-        text = []
         try:
-            doc = Document(file_obj)
-            for para in doc.paragraphs:
-                text.append(para.text)
+            return "\n".join(iter_docx_paragraphs(file_obj))
         except Exception as e:
             logger.error(f"DOCX extraction error: {e}")
             raise e
-        return "\n".join(text)
 
     def _extract_txt(self, file_obj) -> str:
         # Handle both path string and file-like object
@@ -0,0 +1,160 @@
+import zlib
+import time
+import sqlite3
+import logging
+import threading
+
+from src.pipeline import Stage
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SEGMENTS = 64 # Segments per compressed block; postings address (block, offset in block)
+CANDIDATES_PER_EXAMPLE = 8 # Postings read per requested example, to pick the best sentences from
+IDEAL_LENGTH = 80 # Characters; examples close to this read best on a card
+MIN_LENGTH = 15 # Shorter segments (headings, labels) are a last resort
+
+# Blocks use AUTOINCREMENT so the ids of a re-indexed source's old blocks are never reused:
+# their postings are left behind, no longer join, and are deleted by prune() when the index is closed
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    url TEXT UNIQUE NOT NULL,
+    segments INTEGER NOT NULL,
+    indexed REAL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_id INTEGER NOT NULL,
+    first_segment INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blocks_source ON blocks(source_id);
+CREATE TABLE IF NOT EXISTS postings (
+    lemma TEXT NOT NULL,
+    block_id INTEGER NOT NULL,
+    offsets BLOB NOT NULL,
+    PRIMARY KEY (lemma, block_id)
+) WITHOUT ROWID;
+"""
+
+def _score(sentence: str) -> float:
+    """Lower is better: distance from IDEAL_LENGTH, with very short segments pushed back."""
+    penalty = 1000 if len(sentence) < MIN_LENGTH else 0
+    return abs(len(sentence) - IDEAL_LENGTH) + penalty
+
+class ExampleIndex:
+    """
+    On-disk inverted index (SQLite) from lemma to the segments it occurs in. Segments are
+    stored zlib-compressed in blocks of BLOCK_SEGMENTS; a posting is (lemma, block) with
+    the byte offsets of the segments in that block, so a lemma's examples cost one index
+    range scan plus a few small decompressions, however large the corpus.
+    Thread-safe (the indexing stage writes while the card stage reads).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # The index can be rebuilt from the sources, so losing the last commits on power failure is fine
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA cache_size=-65536") # 64 MiB: postings inserts hit pages all over the lemma order
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._reindexed = False # A source was replaced, so prune() has something to do
+
+    def close(self):
+        if self._reindexed:
+            logger.info(f"Pruned {self.prune()} stale postings from {self.path}.")
+        self.conn.close()
+
+    def add(self, source: str, segments: list[str], lemma_lists: list[list[str]]):
+        """Indexes one source's segments (lemma_lists[i] are the lemmas of segments[i]), replacing an older version."""
+        with self._lock, self.conn:
+            replaced = self.conn.execute(
+                "DELETE FROM blocks WHERE source_id = (SELECT id FROM sources WHERE url = ?)", (source,)
+            ).rowcount
+            self._reindexed = self._reindexed or replaced > 0
+            self.conn.execute(
+                "INSERT INTO sources (url, segments, indexed) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET segments = excluded.segments, indexed = excluded.indexed",
+                (source, len(segments), time.time())
+            )
+            source_id = self.conn.execute("SELECT id FROM sources WHERE url = ?", (source,)).fetchone()[0]
+            for start in range(0, len(segments), BLOCK_SEGMENTS):
+                block = [s.replace("\n", " ") for s in segments[start:start + BLOCK_SEGMENTS]]
+                block_id = self.conn.execute(
+                    "INSERT INTO blocks (source_id, first_segment, data) VALUES (?, ?, ?)",
+                    (source_id, start, zlib.compress("\n".join(block).encode("utf-8")))
+                ).lastrowid
+                offsets = {} # lemma -> offsets in this block, each once
+                for offset, lemmas in enumerate(lemma_lists[start:start + BLOCK_SEGMENTS]):
+                    for lemma in lemmas:
+                        found = offsets.setdefault(lemma, [])
+                        if not found or found[-1] != offset:
+                            found.append(offset)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO postings (lemma, block_id, offsets) VALUES (?, ?, ?)",
+                    ((lemma, block_id, bytes(found)) for lemma, found in offsets.items())
+                )
+
+    def examples(self, lemma: str, n: int = 5) -> list[tuple[str, str]]:
+        """
+        Up to n example sentences for lemma as (sentence, source), best first: sentences
+        close to IDEAL_LENGTH, from as many different sources as possible.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT b.data, p.offsets, s.url FROM postings p "
+                "JOIN blocks b ON b.id = p.block_id JOIN sources s ON s.id = b.source_id "
+                "WHERE p.lemma = ? ORDER BY p.block_id LIMIT ?",
+                (lemma, n * CANDIDATES_PER_EXAMPLE)
+            ).fetchall()
+        candidates = []
+        for data, offsets, url in rows:
+            block = zlib.decompress(data).decode("utf-8").split("\n")
+            candidates.extend((block[offset], url) for offset in offsets)
+        candidates.sort(key=lambda c: _score(c[0]))
+
+        # One sentence per source first, then fill up with the next best ones
+        picked, sources = [], set()
+        for candidate in candidates:
+            if candidate[1] not in sources and len(picked) < n:
+                picked.append(candidate)
+                sources.add(candidate[1])
+        for candidate in candidates:
+            if len(picked) >= n:
+                break
+            if candidate not in picked:
+                picked.append(candidate)
+        picked.sort(key=lambda c: _score(c[0]))
+        return picked
+
+    def example(self, lemma: str):
+        """The best example sentence for lemma, or None (the CardBuilder examples hook)."""
+        found = self.examples(lemma, 1)
+        return found[0][0] if found else None
+
+    def with_examples(self, cards):
+        """Yields the cards with an 'Example' field filled in from the index."""
+        for card in cards:
+            yield {**card, "Example": self.example(card["Front"]) or ""}
+
+    def prune(self) -> int:
+        """Deletes postings left behind by re-indexed sources. Returns how many were removed."""
+        with self._lock, self.conn:
+            self._reindexed = False
+            return self.conn.execute("DELETE FROM postings WHERE block_id NOT IN (SELECT id FROM blocks)").rowcount
+
+    def counts(self) -> dict:
+        with self._lock:
+            sources, segments = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(segments), 0) FROM sources").fetchone()
+            lemmas = self.conn.execute("SELECT COUNT(DISTINCT lemma) FROM postings").fetchone()[0]
+        return {"sources": sources, "segments": segments, "lemmas": lemmas}
+
+class ExampleIndexer(Stage):
+    """Pipeline stage (after lemmatizing) that adds each item's segments to an ExampleIndex."""
+    def __init__(self, index: ExampleIndex):
+        super().__init__("index", self._index, 1)
+        self.index = index
+
+    def _index(self, item):
+        self.index.add(item.item, item.segments, item.lemma_lists)
@@ -0,0 +1,98 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+
+from src.registry import LOADERS
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    content_hash TEXT,
+    processed REAL
+);
+"""
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+def iter_documents(folder: str):
+    """Yields (path, os.stat_result) for every supported document below folder, in path order."""
+    entries = []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if not name.startswith(".") and os.path.splitext(name)[1].lower() in LOADERS:
+                entries.append(os.path.join(root, name))
+    for path in sorted(entries):
+        try:
+            yield path, os.stat(path)
+        except OSError as e: # Removed while scanning
+            logger.warning(f"Skipping {path}: {e}")
+
+class FolderManifest:
+    """
+    Manifest (SQLite) of the documents of watched folders: size, mtime and content hash
+    each file was last processed with. A file whose size and mtime are unchanged isn't
+    even read; one that was only touched is hashed and found unchanged.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def scan(self, folder: str) -> list[tuple[str, int, int, str]]:
+        """
+        Returns [(path, size, mtime_ns, content_hash)] for documents below folder that are
+        new or modified since they were last processed. Files that were removed are
+        forgotten, so they count as new if they come back.
+        """
+        folder = os.path.abspath(folder)
+        prefix = os.path.join(folder, "")
+        known = {row[0]: row[1:] for row in self.conn.execute(
+            "SELECT path, size, mtime_ns, content_hash FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+        )}
+        changed, touched, present = [], [], set()
+        for path, st in iter_documents(folder):
+            present.add(path)
+            previous = known.get(path)
+            if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+                continue
+            digest = file_hash(path)
+            if previous and previous[2] == digest:
+                touched.append((st.st_size, st.st_mtime_ns, path))
+                continue
+            changed.append((path, st.st_size, st.st_mtime_ns, digest))
+
+        with self.conn:
+            # Same content, new mtime: remember the new stat so the file isn't hashed again
+            self.conn.executemany("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", touched)
+            self.conn.executemany("DELETE FROM files WHERE path = ?", ((p,) for p in known if p not in present))
+        logger.info(f"{folder}: {len(present)} documents, {len(changed)} new or modified.")
+        return changed
+
+    def mark_processed(self, entries):
+        """Records [(path, size, mtime_ns, content_hash)] whose cards have been written."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO files (path, size, mtime_ns, content_hash, processed) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, "
+                "content_hash = excluded.content_hash, processed = excluded.processed",
+                ((path, size, mtime_ns, digest, now) for path, size, mtime_ns, digest in entries)
+            )
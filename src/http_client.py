@@ -0,0 +1,297 @@
+import re
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from urllib.parse import urlparse
+
+import requests
+import lxml.html
+from lxml import etree
+
+from src.rate_control import get_controller
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 8 * 1024 * 1024 # Pages larger than this are runaway responses, not chapters/articles
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+CHUNK_SIZE = 16 * 1024
+META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+
+# Tail-latency control: an attempt gets ATTEMPT_TIMEOUT (connect and per read), a fetch
+# with all its retries and hedges DEADLINE. GETs are idempotent, so they are retried.
+ATTEMPT_TIMEOUT = 10.0
+DEADLINE = 45.0
+MAX_ATTEMPTS = 3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+BACKOFF_BASE = 0.5 # Seconds; doubled per retry, with full jitter
+BACKOFF_MAX = 8.0
+HEDGE_QUANTILE = 0.95 # A hedge is sent once the first request is slower than this
+HEDGE_MIN_SAMPLES = 20 # Latencies needed per host before hedging
+LATENCY_WINDOW = 200 # Recent latencies kept per host
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_local = threading.local()
+
+def get_session() -> requests.Session:
+    """Returns this thread's shared session (keeps connections to each host alive)."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+    return session
+
+class FetchStats:
+    """
+    Process-wide counters of the fetch layer (requests, attempts, retries, hedges and how
+    often the hedge won, timeouts, failures) plus recent response latencies per host,
+    which set the hedging threshold.
+    """
+    FIELDS = ("requests", "attempts", "retries", "hedges", "hedge_wins", "timeouts", "failures")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+        self._latencies = {}
+
+    def add(self, field: str, n: int = 1):
+        with self._lock:
+            self._counts[field] += n
+
+    def observe(self, host: str, latency: float):
+        with self._lock:
+            window = self._latencies.get(host)
+            if window is None:
+                window = self._latencies[host] = deque(maxlen=LATENCY_WINDOW)
+            window.append(latency)
+
+    def quantile(self, host: str, q: float = HEDGE_QUANTILE):
+        """The host's recent latency quantile, or None with too few samples."""
+        with self._lock:
+            window = self._latencies.get(host)
+            if window is None or len(window) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(window)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def summary(self) -> str:
+        counts = self.snapshot()
+        return ", ".join(f"{counts[field]} {field.replace('_', ' ')}" for field in self.FIELDS)
+
+_stats = FetchStats()
+_hedging = False
+_hedge_pool = None
+_pool_lock = threading.Lock()
+
+def get_stats() -> FetchStats:
+    return _stats
+
+def set_hedging(enabled: bool):
+    """Turns hedged requests on or off for all fetches that don't pass hedge= themselves."""
+    global _hedging
+    _hedging = enabled
+
+def _pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(16, thread_name_prefix="fetch")
+        return _hedge_pool
+
+def backoff_delay(retry: int) -> float:
+    """Full-jitter exponential backoff before retry number retry (0-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** retry))
+
+def _attempt(url: str, session, timeout: float, kwargs: dict) -> requests.Response:
+    """One GET through the rate controller, feeding back status, latency and Retry-After."""
+    host = urlparse(url).netloc
+    controller = get_controller()
+    controller.acquire(host)
+    _stats.add("attempts")
+
+    start = time.monotonic()
+    try:
+        response = (session or get_session()).get(url, timeout=timeout, **kwargs)
+    except requests.RequestException as e:
+        if isinstance(e, requests.Timeout):
+            _stats.add("timeouts")
+        controller.record(host, error=True)
+        raise
+    latency = time.monotonic() - start
+    controller.record(host, status=response.status_code, latency=latency,
+                      retry_after=response.headers.get('Retry-After'))
+    if response.status_code < 500:
+        _stats.observe(host, latency)
+    return response
+
+def _discard(future):
+    # The losing request of a hedge: close its connection once it answers
+    if future.exception() is None:
+        future.result().close()
+
+def _hedged_attempt(url: str, session, timeout: float, kwargs: dict) -> requests.Response:
+    """
+    Sends the request, and if it hasn't answered within the host's p95 latency, a second
+    one (on another connection). Returns whichever succeeds first.
+    """
+    threshold = _stats.quantile(urlparse(url).netloc)
+    if threshold is None or threshold >= timeout:
+        return _attempt(url, session, timeout, kwargs)
+    first = _pool().submit(_attempt, url, session, timeout, kwargs)
+    try:
+        return first.result(timeout=threshold)
+    except FutureTimeout:
+        pass
+
+    logger.debug(f"Hedging {url} after {threshold:.2f}s.")
+    _stats.add("hedges")
+    second = _pool().submit(_attempt, url, None, timeout, kwargs)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+                continue
+            for other in pending:
+                other.add_done_callback(_discard)
+            if future is second:
+                _stats.add("hedge_wins")
+            return future.result()
+    raise error
+
+def get(url: str, session: requests.Session = None, timeout: float = ATTEMPT_TIMEOUT, deadline: float = DEADLINE,
+        attempts: int = MAX_ATTEMPTS, hedge: bool = None, **kwargs) -> requests.Response:
+    """
+    GET through the shared per-host rate controller, with tail-latency control.
+    Each attempt may take timeout seconds (less once the deadline is near). Timeouts,
+    connection errors and 429/5xx responses are retried with jittered exponential
+    backoff, up to attempts in total. With hedging (set_hedging() or hedge=True), an
+    attempt slower than the host's p95 latency gets a second, parallel request.
+    Raises the last error when out of attempts or time; a final 429/5xx is returned.
+    """
+    _stats.add("requests")
+    hedge = _hedging if hedge is None else hedge
+    end = time.monotonic() + deadline
+    retry = 0
+    while True:
+        remaining = end - time.monotonic()
+        try:
+            response = (_hedged_attempt if hedge else _attempt)(url, session, min(timeout, remaining), kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            response, error, reason = None, e, str(e)
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            reason = f"status {response.status_code}"
+
+        delay = backoff_delay(retry)
+        if retry + 1 >= attempts or time.monotonic() + delay + 1.0 > end:
+            if response is not None:
+                return response
+            _stats.add("failures")
+            raise error
+        if response is not None:
+            response.close()
+        retry += 1
+        _stats.add("retries")
+        logger.info(f"Retrying {url} in {delay:.1f}s ({reason}).")
+        time.sleep(delay)
+
+class ResponseTooLarge(requests.RequestException):
+    """The response body exceeded the allowed size."""
+
+class UnexpectedContentType(requests.RequestException):
+    """The response isn't HTML (e.g. a PDF or image behind an article link)."""
+
+def _charset(content_type: str):
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip('"\'')
+    return None
+
+def declared_charset(head: bytes, default: str = "utf-8") -> str:
+    """The <meta charset> declared in the start of an HTML document, or default."""
+    match = META_CHARSET.search(head[:4096])
+    return match.group(1).decode("ascii") if match else default
+
+def stream_html(url: str, stop=None, max_bytes: int = MAX_BODY_BYTES, session: requests.Session = None,
+                timeout: float = ATTEMPT_TIMEOUT, chunk_size: int = CHUNK_SIZE, deadline: float = DEADLINE):
+    """
+    Fetches an HTML page and parses it while it downloads: chunks go straight from the
+    socket into an incremental lxml parser, so the body is never held as bytes and a tree.
+
+    stop(element) is called for each element as its end tag is parsed; when it returns
+    True, reading stops and the tree parsed so far is returned (with open elements closed).
+    Requests are retried as in get(); a body that stalls or breaks off mid-download is
+    fetched again too, all within deadline.
+    Raises requests.HTTPError for error statuses, UnexpectedContentType for non-HTML
+    responses and ResponseTooLarge once more than max_bytes arrive.
+    Returns the root lxml.html element.
+    """
+    end = time.monotonic() + deadline
+    retry = 0
+    while True:
+        response = get(url, session=session, timeout=timeout, deadline=end - time.monotonic(), stream=True)
+        try:
+            return _parse_stream(url, response, stop, max_bytes, chunk_size)
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            delay = backoff_delay(retry)
+            if retry + 1 >= MAX_ATTEMPTS or time.monotonic() + delay + 1.0 > end:
+                _stats.add("failures")
+                raise
+            retry += 1
+            _stats.add("retries")
+            logger.info(f"Retrying {url} in {delay:.1f}s (body: {e}).")
+        finally:
+            # Closing without reading the rest drops the connection instead of draining it
+            response.close()
+        time.sleep(delay)
+
+def _parse_stream(url: str, response: requests.Response, stop, max_bytes: int, chunk_size: int):
+    response.raise_for_status()
+    content_type = response.headers.get("Content-Type", "")
+    mime = content_type.split(";")[0].strip().lower()
+    if mime and mime not in HTML_TYPES:
+        raise UnexpectedContentType(f"{url} returned {mime}, expected HTML", response=response)
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise ResponseTooLarge(f"{url} is {int(length)} bytes (limit {max_bytes})", response=response)
+
+    charset = _charset(content_type)
+    parser = None
+    received = 0
+    stopped = False
+    for chunk in response.iter_content(chunk_size):
+        received += len(chunk)
+        if received > max_bytes:
+            raise ResponseTooLarge(f"{url} exceeded {max_bytes} bytes", response=response)
+        if parser is None:
+            # Without an HTTP charset, libxml2 would fall back to latin-1. Element events are
+            # only collected for stop (the parser queues "end" events by default)
+            parser = etree.HTMLPullParser(events=("end",) if stop is not None else (),
+                                          encoding=charset or declared_charset(chunk))
+            parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+        parser.feed(chunk)
+        if stop is not None:
+            for _, element in parser.read_events():
+                if stop(element):
+                    stopped = True
+                    break
+            if stopped:
+                break
+    if stopped:
+        logger.debug(f"Stopped reading {url} after {received} bytes.")
+    if parser is None:
+        raise requests.RequestException(f"{url} returned an empty body", response=response)
+    return parser.close()
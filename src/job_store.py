@@ -0,0 +1,195 @@
+import time
+import random
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    lease_owner TEXT,
+    lease_until REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS urls_due ON urls (state, next_attempt, position);
+CREATE TABLE IF NOT EXISTS cards (
+    front TEXT PRIMARY KEY,
+    back TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    url TEXT,
+    provenance TEXT
+);
+CREATE TABLE IF NOT EXISTS lemmas (
+    lemma TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+# Columns added after the first release, for stores created by older versions
+MIGRATIONS = {
+    ("urls", "lease_owner"): "ALTER TABLE urls ADD COLUMN lease_owner TEXT",
+    ("urls", "lease_until"): "ALTER TABLE urls ADD COLUMN lease_until REAL NOT NULL DEFAULT 0",
+    ("cards", "provenance"): "ALTER TABLE cards ADD COLUMN provenance TEXT",
+}
+
+class JobStore:
+    """
+    Durable state of a URL batch in SQLite: each URL's state (pending, done, failed),
+    its attempt count and the cards it produced. A URL and its cards are committed in
+    one transaction, so a resumed run never redoes a completed fetch or translation.
+    Failed URLs are retried with exponential backoff until max_attempts is reached.
+
+    Several workers can share a store (see src/broker.py): claim() leases a URL to one
+    worker, and a lease that isn't completed in time (crashed worker) simply expires.
+    The store itself doesn't lock; callers sharing one instance across threads must.
+    """
+    def __init__(self, path: str, max_attempts: int = 5, base_delay: float = 2.0, max_delay: float = 300.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            for (table, column), statement in MIGRATIONS.items():
+                if column not in {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}:
+                    self.conn.execute(statement)
+
+    def close(self):
+        self.conn.close()
+
+    def add_urls(self, urls: list[str]) -> int:
+        """Registers URLs (keeping the order given). Already known URLs keep their state."""
+        with self.conn:
+            start = self.conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM urls").fetchone()[0]
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, position) VALUES (?, ?)",
+                ((url, start + i) for i, url in enumerate(urls))
+            )
+            return self.conn.total_changes - before
+
+    def claim(self, owner: str, lease_seconds: float = 300.0, reclaim_own: bool = True):
+        """
+        Leases the next due URL to owner and returns it, or None. Atomic across processes.
+        An expired lease makes a URL due again; with reclaim_own=False not if owner holds it,
+        for owners that keep several URLs in flight (they are still being processed).
+        """
+        now = time.time()
+        with self.conn:
+            row = self.conn.execute(
+                "UPDATE urls SET lease_owner = ?, lease_until = ? WHERE url = ("
+                "  SELECT url FROM urls WHERE state = ? AND next_attempt <= ? AND lease_until <= ?"
+                "  AND (? OR lease_owner IS NULL OR lease_owner != ?)"
+                "  ORDER BY position LIMIT 1"
+                ") RETURNING url",
+                (owner, now + lease_seconds, PENDING, now, now, reclaim_own, owner)
+            ).fetchone()
+        return row[0] if row else None
+
+    def renew_leases(self, owner: str, lease_seconds: float = 300.0) -> int:
+        """Extends every lease owner holds on a pending URL, so other owners don't take them over."""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE urls SET lease_until = ? WHERE lease_owner = ? AND state = ?",
+                (time.time() + lease_seconds, owner, PENDING)
+            ).rowcount
+
+    def release_leases(self, owner: str) -> int:
+        """Makes URLs leased by owner claimable again (e.g. after that owner crashed)."""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE urls SET lease_owner = NULL, lease_until = 0 WHERE lease_owner = ? AND state = ?", (owner, PENDING)
+            ).rowcount
+
+    def seconds_until_next(self):
+        """Seconds until the next pending URL is due (or its lease expires), or None if nothing is pending."""
+        row = self.conn.execute("SELECT MIN(MAX(next_attempt, lease_until)) FROM urls WHERE state = ?", (PENDING,)).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def mark_done(self, url: str, cards: list[dict], lemmas: set) -> int:
+        """
+        Stores the URL's cards and seen lemmas and marks it done, atomically.
+        Cards for words that already have one are ignored; returns the number stored.
+        """
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO cards (front, back, tags, url, provenance) VALUES (?, ?, ?, ?, ?)",
+                ((c["Front"], c["Back"], c["Tags"], url, c.get("Provenance")) for c in cards)
+            )
+            stored = self.conn.total_changes - before
+            self.conn.executemany("INSERT OR IGNORE INTO lemmas (lemma) VALUES (?)", ((l,) for l in lemmas))
+            self.conn.execute(
+                "UPDATE urls SET state = ?, last_error = NULL, lease_owner = NULL, lease_until = 0 WHERE url = ?",
+                (DONE, url)
+            )
+        return stored
+
+    def mark_failed(self, url: str, error: str):
+        """Records a failed attempt and schedules a retry with jittered exponential backoff."""
+        with self.conn:
+            attempts = self.conn.execute("SELECT attempts FROM urls WHERE url = ?", (url,)).fetchone()[0] + 1
+            if attempts >= self.max_attempts:
+                state, next_attempt = FAILED, 0
+                logger.error(f"Giving up on {url} after {attempts} attempts: {error}")
+            else:
+                delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+                delay *= random.uniform(0.5, 1.0) # Jitter
+                state, next_attempt = PENDING, time.time() + delay
+                logger.warning(f"Attempt {attempts} for {url} failed ({error}). Retrying in {delay:.1f}s.")
+            self.conn.execute(
+                "UPDATE urls SET state = ?, attempts = ?, next_attempt = ?, last_error = ?, lease_owner = NULL, lease_until = 0 "
+                "WHERE url = ?",
+                (state, attempts, next_attempt, error, url)
+            )
+
+    def retry_failed(self) -> int:
+        """Puts URLs that exhausted their attempts back into the queue."""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE urls SET state = ?, attempts = 0, next_attempt = 0 WHERE state = ?", (PENDING, FAILED)
+            ).rowcount
+
+    def counts(self) -> dict:
+        """URLs per state. Leased URLs count as pending until they're done or failed."""
+        counts = {PENDING: 0, DONE: 0, FAILED: 0}
+        for state, n in self.conn.execute("SELECT state, COUNT(*) FROM urls GROUP BY state"):
+            counts[state] = n
+        return counts
+
+    def seen_lemmas(self) -> set:
+        return {row[0] for row in self.conn.execute("SELECT lemma FROM lemmas")}
+
+    def seen_among(self, lemmas: list[str]) -> set:
+        """The subset of lemmas that already have been seen, without loading the whole set."""
+        seen = set()
+        lemmas = list(lemmas)
+        for start in range(0, len(lemmas), 500): # SQLite's bound parameter limit
+            chunk = lemmas[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            seen.update(row[0] for row in self.conn.execute(f"SELECT lemma FROM lemmas WHERE lemma IN ({placeholders})", chunk))
+        return seen
+
+    def iter_cards(self):
+        """Yields all stored cards in the order they were produced."""
+        for front, back, tags, url, provenance in self.conn.execute(
+            "SELECT front, back, tags, url, provenance FROM cards ORDER BY rowid"
+        ):
+            yield {"Front": front, "Back": back, "Tags": tags, "Source": url, "Provenance": provenance}
+
+    def failed_urls(self) -> list[tuple[str, int, str]]:
+        return self.conn.execute(
+            "SELECT url, attempts, last_error FROM urls WHERE state = ? ORDER BY position", (FAILED,)
+        ).fetchall()
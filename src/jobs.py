@@ -0,0 +1,246 @@
+import os
+import csv
+import json
+import time
+import uuid
+import logging
+import threading
+
+from src.cards import CardBuilder, CardBuffer
+from src.card_sink import CsvCardSink
+from src.pipeline import card_pipeline
+from src.manifest import find_chapters
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = "jobs"
+
+class ScrapeJob:
+    """
+    A scraping run (crawl -> scrape -> lemmatize -> translate) executed in a background thread.
+    State and cards are written to its own directory after every item, so a job can be
+    cancelled, picked up again after a rerun or restart, and resumed where it stopped.
+    """
+    def __init__(self, job_dir: str, items: list[str], settings: dict, crawl_url: str = None, name: str = ""):
+        self.job_dir = job_dir
+        self.job_id = os.path.basename(job_dir)
+        self.name = name or self.job_id
+        self.items = items
+        self.settings = settings
+        self.crawl_url = crawl_url # If set, the item list is discovered by the worker first
+        self.next_index = 0
+        self.failed = [] # Indices of items that failed; retried when the job is resumed
+        self.status = "pending"
+        self.message = ""
+        self.created_at = time.time()
+
+        self.cards = CardBuffer() # Also the job's seen-lemma set
+
+        self._cancel = threading.Event()
+        self._thread = None
+
+    # --- Persistence ---
+
+    @property
+    def state_file(self):
+        return os.path.join(self.job_dir, "state.json")
+
+    @property
+    def cards_file(self):
+        return os.path.join(self.job_dir, "cards.csv")
+
+    def _save_state(self):
+        state = {
+            "name": self.name,
+            "items": self.items,
+            "settings": self.settings,
+            "crawl_url": self.crawl_url,
+            "next_index": self.next_index,
+            "failed": self.failed,
+            "status": self.status,
+            "message": self.message,
+            "created_at": self.created_at,
+        }
+        # Write to a temp file and rename so a crash never leaves a half-written state
+        tmp = self.state_file + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp, self.state_file)
+
+    @classmethod
+    def load(cls, job_dir: str):
+        """Restores a job from its directory. Returns None if the state is unreadable."""
+        try:
+            with open(os.path.join(job_dir, "state.json"), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load job {job_dir}: {e}")
+            return None
+
+        job = cls(job_dir, state["items"], state["settings"], state.get("crawl_url"), state.get("name", ""))
+        job.next_index = state["next_index"]
+        job.failed = state.get("failed", [])
+        job.message = state.get("message", "")
+        job.created_at = state.get("created_at", job.created_at)
+        # A job that was running when the process died is resumable, not running
+        job.status = "interrupted" if state["status"] in ("pending", "running") else state["status"]
+
+        if os.path.exists(job.cards_file):
+            with open(job.cards_file, 'r', newline='', encoding='utf-8') as f:
+                job.cards.extend(csv.DictReader(f, delimiter=';'))
+        return job
+
+    # --- Control ---
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def progress(self) -> float:
+        if not self.items:
+            return 0.0
+        return min(self.next_index / len(self.items), 1.0)
+
+    def cards_frame(self):
+        """The cards produced so far as a DataFrame (safe while the worker is running, cached between calls)."""
+        return self.cards.to_dataframe()
+
+    def start(self, vp, translator):
+        """Starts (or resumes) the worker thread."""
+        if self.is_running:
+            return
+        self._cancel.clear()
+        self.status = "running"
+        self._save_state()
+        self._thread = threading.Thread(target=self._run, args=(vp, translator), name=f"job-{self.job_id}", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Asks the worker to stop after the current item. The job can be resumed later."""
+        self._cancel.set()
+
+    # --- Worker ---
+
+    def _run(self, vp, translator):
+        try:
+            if self.crawl_url and not self.items:
+                self.message = "Recursively crawling for chapters..."
+                self.items = find_chapters(self.crawl_url)
+                if not self.items:
+                    raise RuntimeError("No chapters found in recursive crawl.")
+                self._save_state()
+
+            # Cards are flushed before the state is saved, so the state never claims more than is on disk
+            sink = CsvCardSink(self.cards_file, append=True, flush_every=500, flush_interval=5.0)
+            try:
+                self._process_items(sink, vp, translator)
+            finally:
+                sink.close()
+        except Exception as e:
+            logger.error(f"Job {self.job_id} failed: {e}")
+            self.status = "failed"
+            self.message = str(e)
+        self._save_state()
+
+    def _process_items(self, sink, vp, translator):
+        total = len(self.items)
+        # A fresh builder per run, seeded from the items already written, so a cancelled
+        # run leaves no trace of the items that were still in flight
+        builder = CardBuilder(
+            translator,
+            no_translate=self.settings.get("no_translate", False),
+            filter_untranslated=self.settings.get("filter_untranslated", True),
+            seen=self.cards.seen(),
+        )
+        pipeline = card_pipeline(
+            vp, builder,
+            fetch_workers=self.settings.get("fetch_workers", 4),
+            translate_workers=self.settings.get("translate_workers", 4),
+            prefetch_workers=self.settings.get("prefetch_workers", 2),
+            cancel=self._cancel,
+        )
+        # Items that failed in an earlier run go first, then the ones never processed
+        order = self.failed + list(range(self.next_index, total))
+        self.message = self._processing(order[0]) if order else ""
+
+        # Uploaded files are stored inside the job directory, everything else is a URL
+        results = pipeline.run([self.items[i] for i in order])
+        try:
+            for position, (index, result) in enumerate(zip(order, results)):
+                if self._cancel.is_set():
+                    break
+                if result.ok:
+                    if result.cards:
+                        # The GUI shows and stores only the deck columns
+                        sink.write_many(result.cards)
+                        sink.flush()
+                        self.cards.extend(result.cards)
+                    self.cards.mark_seen(result.new_lemmas)
+                if index in self.failed:
+                    if result.error is None:
+                        self.failed.remove(index)
+                elif result.error is not None:
+                    self.failed.append(index)
+                self.next_index = max(self.next_index, index + 1)
+                self._save_state()
+                if position + 1 < len(order):
+                    self.message = self._processing(order[position + 1])
+        finally:
+            results.close()
+
+        if self._cancel.is_set() and (self.next_index < total or self.failed):
+            self.status = "cancelled"
+            self.message = f"Cancelled at {self.next_index}/{total}"
+            return
+        self.status = "done"
+        self.message = f"Processing Complete! {len(self.cards)} cards."
+        if self.failed:
+            self.message += f" {len(self.failed)} failed item(s) will be retried on resume."
+
+    def _processing(self, index: int) -> str:
+        return f"Processing ({index + 1}/{len(self.items)}): {self.items[index]}"
+
+class JobManager:
+    """
+    Keeps track of all scraping jobs of the server process. Jobs left on disk by a
+    previous process are loaded on start-up so they can be reviewed or resumed.
+    """
+    def __init__(self, jobs_dir: str = JOBS_DIR):
+        self.jobs_dir = jobs_dir
+        self.jobs = {}
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        for entry in sorted(os.listdir(self.jobs_dir)):
+            job_dir = os.path.join(self.jobs_dir, entry)
+            if os.path.isdir(job_dir):
+                job = ScrapeJob.load(job_dir)
+                if job:
+                    self.jobs[job.job_id] = job
+
+    def create_job(self, items: list[str], settings: dict, crawl_url: str = None,
+                   upload_name: str = None, upload_data: bytes = None, name: str = "") -> ScrapeJob:
+        """
+        Creates a new job directory. An uploaded file is copied into it, so the job
+        does not depend on the browser session that uploaded it.
+        """
+        job_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir)
+
+        if upload_name is not None:
+            upload_path = os.path.join(job_dir, os.path.basename(upload_name))
+            with open(upload_path, 'wb') as f:
+                f.write(upload_data)
+            items = [upload_path]
+
+        job = ScrapeJob(job_dir, items, settings, crawl_url, name)
+        job._save_state()
+        self.jobs[job_id] = job
+        return job
+
+    def get(self, job_id: str) -> ScrapeJob:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> list[ScrapeJob]:
+        """Returns all jobs, newest first."""
+        return sorted(self.jobs.values(), key=lambda j: j.created_at, reverse=True)
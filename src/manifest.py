@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import logging
+from urllib.parse import urljoin, urlparse, parse_qs
+
+from src import http_client
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://www.churchofjesuschrist.org"
+SCRIPTURES_PATH = "/study/scriptures"
+VOLUMES = ["ot", "nt", "bofm", "dc-testament", "pgp"] # Canonical order
+DEFAULT_LANG = "fin"
+
+MANIFEST_VERSION = 1 # Bump when the format or the chapter rules change; older manifests are rebuilt
+DEFAULT_DIR = "manifests"
+MAX_AGE_DAYS = 90
+
+# Pages under a volume that aren't chapters of a book
+NON_CONTENT = ("title-page", "introduction", "illustrations", "pronunciation", "bofm-title", "three", "eight")
+
+def parse_scripture_url(url: str):
+    """
+    Splits a scripture URL into (volume, book, chapter, lang); missing parts are None.
+    Returns None for URLs outside /study/scriptures.
+    """
+    parsed = urlparse(url)
+    if not parsed.path.startswith(SCRIPTURES_PATH + "/"):
+        return None
+    parts = [p for p in parsed.path[len(SCRIPTURES_PATH):].split("/") if p]
+    if not parts or len(parts) > 3:
+        return None
+    parts += [None] * (3 - len(parts))
+    lang = parse_qs(parsed.query).get("lang", [None])[0]
+    return parts[0], parts[1], parts[2], lang
+
+def chapter_url(volume: str, entry: str, lang: str) -> str:
+    return f"{BASE_URL}{SCRIPTURES_PATH}/{volume}/{entry}?lang={lang}"
+
+def _collect(url: str, volume: str, books: dict):
+    """Adds the books (in page order) and numeric chapters linked from url to books."""
+    tree = http_client.stream_html(url)
+    for a in tree.xpath("//a[@href]"):
+        parsed = parse_scripture_url(urljoin(url, a.get("href")))
+        if parsed is None:
+            continue
+        link_volume, book, chapter, _ = parsed
+        if link_volume != volume or book is None or book in NON_CONTENT:
+            continue
+        chapters = books.setdefault(book, set())
+        if chapter is not None and chapter.isdigit():
+            chapters.add(chapter)
+
+def build_volume(volume: str, lang: str = DEFAULT_LANG) -> list[str]:
+    """
+    Discovers a volume's chapters from its index pages. Returns "book/chapter" entries
+    in canonical order: books as the volume index lists them, chapters by number.
+    """
+    books = {} # book -> chapters; dict order is the index's book order
+    _collect(f"{BASE_URL}{SCRIPTURES_PATH}/{volume}?lang={lang}", volume, books)
+    for book in list(books):
+        if not books[book]:
+            # The volume index only links the book; its chapters are on the book's index
+            logger.info(f"Scanning book index: {volume}/{book}")
+            _collect(f"{BASE_URL}{SCRIPTURES_PATH}/{volume}/{book}?lang={lang}", volume, books)
+    entries = [f"{book}/{chapter}" for book, chapters in books.items() for chapter in sorted(chapters, key=int)]
+    logger.info(f"{volume} ({lang}): {len(entries)} chapters in {len(books)} books.")
+    return entries
+
+class ChapterManifest:
+    """
+    Versioned list of all scripture chapters for one language, stored as compact JSON
+    (manifests/scriptures-<lang>.json). Each volume is rebuilt from the index pages only
+    when missing, older than max_age_days, or written by another MANIFEST_VERSION.
+    """
+    def __init__(self, lang: str = DEFAULT_LANG, directory: str = DEFAULT_DIR, max_age_days: float = MAX_AGE_DAYS):
+        self.lang = lang
+        self.path = os.path.join(directory, f"scriptures-{lang}.json")
+        self.max_age = max_age_days * 86400
+        self.data = self._load()
+
+    def _load(self) -> dict:
+        empty = {"version": MANIFEST_VERSION, "lang": self.lang, "volumes": {}}
+        if not os.path.exists(self.path):
+            return empty
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+            return empty
+        if data.get("version") != MANIFEST_VERSION:
+            logger.info(f"Manifest {self.path} has version {data.get('version')}, rebuilding.")
+            return empty
+        return data
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def is_stale(self, volume: str) -> bool:
+        entry = self.data["volumes"].get(volume)
+        return entry is None or time.time() - entry["built"] > self.max_age
+
+    def refresh(self, volume: str):
+        """Rebuilds one volume. On failure, keeps the stale entries rather than none."""
+        try:
+            chapters = build_volume(volume, self.lang)
+        except Exception as e:
+            if volume in self.data["volumes"]:
+                logger.warning(f"Could not refresh {volume} ({e}), using the existing manifest.")
+                return
+            raise
+        if not chapters:
+            logger.warning(f"No chapters found for {volume} ({self.lang}), manifest not updated.")
+            return
+        self.data["volumes"][volume] = {"built": time.time(), "chapters": chapters}
+        self.save()
+
+    def chapters(self, volume: str, refresh: bool = False) -> list[str]:
+        """The volume's "book/chapter" entries, refreshing them first if stale (or forced)."""
+        if refresh or self.is_stale(volume):
+            self.refresh(volume)
+        entry = self.data["volumes"].get(volume)
+        return list(entry["chapters"]) if entry else []
+
+def resolve_chapters(url: str, directory: str = DEFAULT_DIR, refresh: bool = False):
+    """
+    Chapter URLs for a scripture volume, book or chapter URL, in canonical order, from
+    the manifest. Returns None for URLs the manifest doesn't cover.
+    """
+    parsed = parse_scripture_url(url)
+    if parsed is None:
+        return None
+    volume, book, chapter, lang = parsed
+    if volume not in VOLUMES:
+        return None
+    lang = lang or DEFAULT_LANG
+    if chapter is not None:
+        return [chapter_url(volume, f"{book}/{chapter}", lang)]
+
+    entries = ChapterManifest(lang, directory).chapters(volume, refresh)
+    if book is not None:
+        entries = [e for e in entries if e.split("/", 1)[0] == book]
+    return [chapter_url(volume, e, lang) for e in entries]
+
+def find_chapters(url: str, directory: str = DEFAULT_DIR, refresh: bool = False) -> list[str]:
+    """Chapters for --recursive: from the manifest for scripture URLs, else by crawling live."""
+    urls = resolve_chapters(url, directory, refresh)
+    if urls is not None:
+        logger.info(f"Found {len(urls)} chapters in the manifest.")
+        return urls
+    from src.crawler import LDSCrawler
+    return LDSCrawler().crawl(url)
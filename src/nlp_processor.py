@@ -1,6 +1,6 @@
 import logging
-import re
 import sys
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,6 +16,10 @@ except ImportError:
 except OSError:
     logger.warning("libvoikko shared library not found.")
 
+WORD_TOKEN = libvoikko.Token.WORD if LIBVOIKKO_AVAILABLE else 1
+NAME_CLASSES = frozenset({'nimi', 'etunimi', 'sukunimi', 'paikannimi'})
+_NAME = object() # Marker for analyses that are proper names
+
 class VoikkoProcessor:
     def __init__(self, lang="fi"):
         if not LIBVOIKKO_AVAILABLE:
@@ -23,6 +27,8 @@ class VoikkoProcessor:
             
         try:
             self.v = libvoikko.Voikko(lang)
+            # A Voikko handle must not be used from several threads at once (background jobs share it)
+            self._lock = threading.Lock()
             logger.info("Voikko initialized successfully.")
         except Exception as e:
             logger.error(f"Failed to initialize Voikko: {e}")
@@ -35,61 +41,86 @@ class VoikkoProcessor:
         Args:
             strict (bool): If True, discards words that Voikko cannot analyze (e.g., foreign words). Defaults to True.
         """
-        # Simple tokenization: split by whitespace and strip punctuation
-        # This is a basic approach; Voikko has tokenization but it's often easier to do custom regex for Anki decks
-        
-        # Remove punctuation characters
-        clean_text = re.sub(r'[^\w\s]', '', text)
-        words = clean_text.split()
-        
-        lemmas = []
-        possible_name_classes = {'nimi', 'etunimi', 'sukunimi', 'paikannimi'}
-        
-        for word in words:
-            # Skip numbers
-            if word.isdigit():
-                continue
-            
-            # Check capitalization before lowercasing for analysis
-            is_capitalized = word[0].isupper()
-            
-            # Voikko analyzes case-insensitively usually if we pass lowercase, 
-            # but for name detection often good to know original.
-            # We'll analyze the lowercase version to find the lemma.
-            analysis_list = self.v.analyze(word.lower())
-            
-            if analysis_list:
-                # Check the first analysis result (usually the most probable)
-                first_analysis = analysis_list[0]
-                word_class = first_analysis.get('CLASS', '')
-                
-                # Filter out known names
-                if word_class in possible_name_classes:
-                    continue
-                    
-                base_form = first_analysis.get('BASEFORM', word.lower())
-                lemmas.append(base_form)
-            else:
-                # If unknown (e.g., proper noun or foreign word)
-                if strict:
-                    # In strict mode, we drop EVERYTHING that Voikko doesn't recognize.
-                    # This filters English words, typos, and names Voikko didn't catch.
-                    continue
+        return self.lemmatize_many([text], strict)[0]
 
-                # Normal mode heuristics
-                if is_capitalized:
-                    continue
-                    
-                # If unknown and not capitalized, we might keep it or drop it.
-                # Let's keep it to be safe, might be a complex inflection Voikko missed (unlikely for Voikko)
-                # or a typo.
-                lemmas.append(word.lower())
-                
-        return lemmas
+    def lemmatize_many(self, sentences: list[str], strict: bool = True) -> list[list[str]]:
+        """
+        Batched version of lemmatize(). Returns one list of lemmas per input sentence.
+        Uses Voikko's own tokenizer, so hyphenated and apostrophe compounds ('linja-auto',
+        'vaa'an') stay whole, and analyzes each distinct word of the batch only once.
+        Args:
+            sentences: Text segments (sentences or paragraphs).
+            strict (bool): If True, discards words that Voikko cannot analyze (e.g., foreign words). Defaults to True.
+        """
+        results = []
+        with self._lock:
+            # Lowercased word -> lemma, _NAME or None (unknown to Voikko)
+            analyses = {}
+
+            for sentence in sentences:
+                lemmas = []
+                for token in self.v.tokens(sentence):
+                    # Skips punctuation, whitespace and unknown characters
+                    if token.tokenType != WORD_TOKEN:
+                        continue
+                    word = token.tokenText
+                    # Skip numbers
+                    if word.isdigit():
+                        continue
+
+                    # Voikko analyzes case-insensitively usually if we pass lowercase,
+                    # but for name detection often good to know original.
+                    key = word.lower()
+                    if key in analyses:
+                        base_form = analyses[key]
+                    else:
+                        base_form = analyses[key] = self._analyze_base_form(key)
+
+                    if base_form is _NAME:
+                        # Filter out known names
+                        continue
+                    if base_form is None:
+                        # If unknown (e.g., proper noun or foreign word)
+                        if strict:
+                            # In strict mode, we drop EVERYTHING that Voikko doesn't recognize.
+                            # This filters English words, typos, and names Voikko didn't catch.
+                            continue
+                        # Normal mode heuristics: unknown capitalized words are likely names.
+                        # Keep the rest, might be a complex inflection Voikko missed or a typo.
+                        if word[0].isupper():
+                            continue
+                        base_form = key
+                    lemmas.append(base_form)
+                results.append(lemmas)
+        return results
+
+    def _analyze_base_form(self, word: str):
+        """Returns the base form of a lowercased word, _NAME for names, or None if Voikko doesn't know it."""
+        analysis_list = self.v.analyze(word)
+        if not analysis_list:
+            return None
+        # Check the first analysis result (usually the most probable)
+        first_analysis = analysis_list[0]
+        if first_analysis.get('CLASS', '') in NAME_CLASSES:
+            return _NAME
+        return first_analysis.get('BASEFORM', word)
+
+    def split_sentences(self, text: str) -> list[str]:
+        """Splits text into sentences using Voikko's sentence splitter."""
+        return self.split_many([text])
+
+    def split_many(self, segments: list[str]) -> list[str]:
+        """Splits every segment into sentences (Voikko's splitter), returning them all in order."""
+        sentences = []
+        with self._lock:
+            for segment in segments:
+                sentences.extend(s.sentenceText.strip() for s in self.v.sentences(segment))
+        return [s for s in sentences if s]
 
     def analyze_word(self, word: str) -> dict:
         """Returns full analysis for a single word."""
-        results = self.v.analyze(word)
+        with self._lock:
+            results = self.v.analyze(word)
         if results:
             return results[0]
         return {}
@@ -100,6 +131,9 @@ if __name__ == "__main__":
     test_sentence = "Minä asuin taloissa ja juoksin metsissä."
     print(f"Original: {test_sentence}")
     print(f"Lemmas: {vp.lemmatize(test_sentence)}")
+
+    batch = ["Linja-auto ajoi torille.", "Vaa'an punnukset olivat raskaita."]
+    print(f"Batch: {vp.lemmatize_many(batch)}")
     
     complex_word = "juoksisinko"
     print(f"Word: {complex_word} -> {vp.analyze_word(complex_word).get('BASEFORM')}")
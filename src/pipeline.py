@@ -0,0 +1,355 @@
+import heapq
+import logging
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+from src import registry
+
+logger = logging.getLogger(__name__)
+
+class PipelineItem:
+    """One source item (URL or document path) and what the stages produced for it."""
+    __slots__ = ("item", "segments", "lemma_lists", "cards", "new_lemmas", "skipped", "error")
+
+    def __init__(self, item):
+        self.item = item
+        self.segments = None
+        self.lemma_lists = None
+        self.cards = None
+        self.new_lemmas = None # Lemmas first seen in this item
+        self.skipped = False # Set by a stage to stop processing the item without an error
+        self.error = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.skipped
+
+class Stage:
+    """
+    One step of the pipeline: func(item) fills in fields of a PipelineItem. It runs on
+    `workers` threads, which suits I/O-bound work (fetching, translating). Items that
+    failed or were skipped in an earlier stage pass through untouched; an exception in
+    func is recorded as the item's error.
+    """
+    def __init__(self, name: str, func, workers: int = 1, window: int = None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.window = window # Items in flight (default: the pipeline's window)
+        self._executor = None
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix=f"stage-{self.name}")
+
+    def stop(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _call(self, item: PipelineItem) -> PipelineItem:
+        try:
+            self.func(item)
+        except Exception as e:
+            logger.error(f"[{self.name}] {item.item}: {e}")
+            item.error = e
+        return item
+
+    def submit(self, item: PipelineItem) -> Future:
+        if not item.ok:
+            done = Future()
+            done.set_result(item)
+            return done
+        return self._executor.submit(self._call, item)
+
+class ProcessStage(Stage):
+    """
+    A CPU-bound step run in worker processes: func(*args(item)) is executed in a process
+    (so func and its arguments must be picklable) and apply(item, result) stores the
+    result in the parent. initializer runs once per process, e.g. to load Voikko.
+    """
+    def __init__(self, name: str, func, args, apply, workers: int = 1, initializer=None):
+        super().__init__(name, func, workers)
+        self.args = args
+        self.apply = apply
+        self.initializer = initializer
+
+    def start(self):
+        self._executor = ProcessPoolExecutor(self.workers, initializer=self.initializer)
+
+    def submit(self, item: PipelineItem) -> Future:
+        if not item.ok:
+            return super().submit(item)
+        done = Future()
+
+        def _finish(future):
+            try:
+                self.apply(item, future.result())
+            except Exception as e:
+                logger.error(f"[{self.name}] {item.item}: {e}")
+                item.error = e
+            done.set_result(item)
+
+        self._executor.submit(self.func, *self.args(item)).add_done_callback(_finish)
+        return done
+
+class Pipeline:
+    """
+    Runs source items through a list of stages. All stages work concurrently (each on its
+    own pool), every stage keeps a few items in flight, and results come out in source
+    order. A single-worker stage therefore also sees items in source order, which is what
+    the card stage relies on for deduplication.
+    """
+    def __init__(self, stages: list[Stage], window: int = None, cancel=None):
+        self.stages = stages
+        self.window = window # Items in flight per stage (default: twice its workers)
+        self.cancel = cancel # threading.Event; stops feeding new items when set
+
+    def _feed(self, source):
+        for item in source:
+            if self.cancel is not None and self.cancel.is_set():
+                return
+            yield PipelineItem(item)
+
+    def _through(self, stage: Stage, upstream):
+        window = stage.window or self.window or 2 * stage.workers
+        pending = deque()
+        for item in upstream:
+            pending.append(stage.submit(item))
+            while pending and (len(pending) >= window or pending[0].done()):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def run(self, source):
+        """Yields a PipelineItem per source item, in order. Closing the generator stops the stages."""
+        for stage in self.stages:
+            stage.start()
+        try:
+            stream = self._feed(source)
+            for stage in self.stages:
+                stream = self._through(stage, stream)
+            yield from stream
+        finally:
+            for stage in self.stages:
+                stage.stop()
+
+    def drain(self, source, sink, on_item=None) -> int:
+        """Runs the pipeline and writes every item's cards to sink (anything with write_many). Returns the card count."""
+        count = 0
+        for result in self.run(source):
+            if result.ok and result.cards:
+                sink.write_many(result.cards)
+                count += len(result.cards)
+            if on_item:
+                on_item(result)
+        return count
+
+# --- Standard stages ---
+
+def load_stage(workers: int = 4, loader=None) -> Stage:
+    """Fetches/reads each item into text segments with loader (default: registry.load_segments)."""
+    loader = loader or registry.load_segments
+    def load(item: PipelineItem):
+        item.segments = loader(item.item)
+        logger.info(f"{item.item}: {len(item.segments)} segments.")
+        if not item.segments:
+            # A page without text is as useless as a failed fetch (which raises by itself)
+            raise RuntimeError("No segments extracted")
+    return Stage("load", load, workers)
+
+_process_vp = None
+
+def _init_process_voikko():
+    global _process_vp
+    _process_vp = registry.get_processor()
+
+def _lemmatize_in_process(segments: list[str], strict: bool) -> tuple[list[str], list[list[str]]]:
+    sentences = _process_vp.split_many(segments)
+    return sentences, _process_vp.lemmatize_many(sentences, strict)
+
+def _set_sentences(item: PipelineItem, result: tuple):
+    item.segments, item.lemma_lists = result
+
+def lemmatize_stage(vp, workers: int = 1, processes: bool = False, strict: bool = True) -> Stage:
+    """
+    Splits each item's segments into sentences (which replace them, so later stages index
+    and gloss sentences) and lemmatizes them. Voikko serializes calls on one handle, so use
+    processes=True (one Voikko per process, vp is then unused) to lemmatize on several
+    cores. With a daemon client (--server), threads are the right choice.
+    """
+    if processes:
+        return ProcessStage(
+            "lemmatize", _lemmatize_in_process,
+            args=lambda item: (item.segments, strict),
+            apply=_set_sentences,
+            workers=workers, initializer=_init_process_voikko,
+        )
+    def lemmatize(item: PipelineItem):
+        item.segments = vp.split_many(item.segments)
+        item.lemma_lists = vp.lemmatize_many(item.segments, strict)
+    return Stage("lemmatize", lemmatize, workers)
+
+class TranslationPrefetcher(Stage):
+    """
+    Pass-through stage (after lemmatizing) that counts the new, uncached lemmas of every
+    item it sees and translates them in the background on `workers` threads, most frequent
+    first. It runs ahead of the card stage, so by the time an item's cards are built most
+    of its words are in the translation cache. Requests go through the translator, so
+    they share its per-host rate budget with everything else.
+    """
+    def __init__(self, builder, workers: int = 2):
+        super().__init__("prefetch", self._observe, 1)
+        self.builder = builder
+        self.prefetch_workers = workers
+        self.counts = Counter() # Occurrences of lemmas not translated yet
+        self.translated = 0 # Lemmas translated ahead of their cards
+        self._heap = [] # (-count, lemma); entries with an outdated count are skipped
+        self._done = set() # Translated, being translated or claimed by the card stage
+        self._inflight = {} # lemma -> Event set once its translation is cached
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._threads = []
+
+    def start(self):
+        super().start()
+        self._stopped = False
+        self._threads = [threading.Thread(target=self._translate_loop, name=f"prefetch-{i}", daemon=True)
+                         for i in range(self.prefetch_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        super().stop()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._threads = []
+        logger.info(f"Prefetched {self.translated} translations.")
+
+    def _cached(self, lemma: str) -> bool:
+        cache = getattr(self.builder.translator, "cache", None) # A daemon client has no local cache
+        return cache is not None and lemma in cache
+
+    def _observe(self, item: PipelineItem):
+        counts = Counter(l for lemmas in item.lemma_lists for l in lemmas
+                         if l not in self._done and self.builder.wants(l))
+        with self._cond:
+            for lemma, n in counts.items():
+                if lemma in self._done:
+                    continue
+                if self._cached(lemma):
+                    self._done.add(lemma)
+                    continue
+                self.counts[lemma] += n
+                heapq.heappush(self._heap, (-self.counts[lemma], lemma))
+            if counts:
+                self._cond.notify_all()
+
+    def _next(self):
+        """The most frequent pending lemma; blocks while there is none. None once stopped."""
+        with self._cond:
+            while not self._stopped:
+                while self._heap:
+                    count, lemma = heapq.heappop(self._heap)
+                    if lemma not in self._done and -count == self.counts[lemma]:
+                        self._done.add(lemma)
+                        self._inflight[lemma] = threading.Event()
+                        del self.counts[lemma]
+                        return lemma
+                self._cond.wait()
+            return None
+
+    def _translate_loop(self):
+        while (lemma := self._next()) is not None:
+            try:
+                if lemma not in self.builder.seen: # Not carded in the meantime
+                    self.builder.translate_ahead(lemma) # Keeps its provenance for the card
+                    with self._cond:
+                        self.translated += 1
+            except Exception as e:
+                logger.warning(f"[prefetch] {lemma}: {e}")
+            finally:
+                with self._cond:
+                    self._inflight.pop(lemma).set()
+
+    def claim(self, lemmas: list[str]) -> list[str]:
+        """
+        Called by the card stage for an item's new words: waits for those being prefetched
+        right now and returns the ones it has to translate itself (which are then no longer
+        prefetched), so no word is requested twice.
+        """
+        own, waiting = [], []
+        with self._cond:
+            for lemma in lemmas:
+                if lemma in self._inflight:
+                    waiting.append(self._inflight[lemma])
+                elif lemma not in self._done:
+                    self._done.add(lemma)
+                    self.counts.pop(lemma, None)
+                    own.append(lemma)
+        for event in waiting:
+            event.wait()
+        return own
+
+class CardStage(Stage):
+    """
+    Builds cards with builder (a CardBuilder, whose seen set is shared across items).
+    Runs on one thread so items are deduplicated in source order; the item's unseen words
+    are translated on translate_workers threads first (with a daemon client, in one
+    request), so building only hits the cache.
+    window is how many items may queue up for it, i.e. how far earlier stages (and a
+    TranslationPrefetcher) can run ahead.
+    """
+    def __init__(self, builder, translate_workers: int = 4, window: int = None, prefetcher: TranslationPrefetcher = None):
+        super().__init__("cards", self._build, 1, window)
+        self.builder = builder
+        self.translate_workers = translate_workers
+        self.prefetcher = prefetcher
+        self._prefetch = None
+
+    def start(self):
+        super().start()
+        if self.translate_workers > 1 and not self.builder.no_translate:
+            self._prefetch = ThreadPoolExecutor(self.translate_workers, thread_name_prefix="translate")
+
+    def stop(self):
+        super().stop()
+        if self._prefetch:
+            self._prefetch.shutdown(wait=False, cancel_futures=True)
+            self._prefetch = None
+
+    def _build(self, item: PipelineItem):
+        unseen = self.builder.unseen(item.lemma_lists)
+        try:
+            missing = self.prefetcher.claim(unseen) if self.prefetcher else unseen
+            if len(missing) > 1 and hasattr(self.builder.translator, "translate_many"):
+                self.builder.translator.translate_many(missing) # A daemon client: one round trip
+            elif self._prefetch and len(missing) > 1:
+                list(self._prefetch.map(self.builder.translate_ahead, missing))
+            item.cards = self.builder.build_many(item.lemma_lists, item.item)
+        except Exception:
+            self.builder.seen.difference_update(unseen) # Don't mark the failed item's words as seen
+            raise
+        item.new_lemmas = set(unseen)
+
+def card_pipeline(vp, builder, fetch_workers: int = 4, lemmatize_workers: int = 1, lemmatize_processes: bool = False,
+                  translate_workers: int = 4, prefetch_workers: int = 2, lookahead: int = 16,
+                  extra_stages: list[Stage] = (), lemma_stages: list[Stage] = (), loader=None, cancel=None) -> Pipeline:
+    """
+    The standard load -> lemmatize -> [prefetch ->] cards pipeline used by the CLI and the
+    GUI jobs. extra_stages run between loading and lemmatizing (e.g. skipping unchanged
+    articles), lemma_stages right after lemmatizing (e.g. indexing example sentences).
+    loader replaces registry.load_segments (e.g. reading a corpus archive).
+    With prefetch_workers, up to lookahead lemmatized items wait for the card stage while
+    their most frequent words are translated in the background.
+    """
+    stages = [load_stage(fetch_workers, loader), *extra_stages,
+              lemmatize_stage(vp, lemmatize_workers, lemmatize_processes), *lemma_stages]
+    if prefetch_workers > 0 and not builder.no_translate:
+        prefetcher = TranslationPrefetcher(builder, prefetch_workers)
+        stages.append(prefetcher)
+        stages.append(CardStage(builder, translate_workers, window=lookahead, prefetcher=prefetcher))
+    else:
+        stages.append(CardStage(builder, translate_workers))
+    return Pipeline(stages, cancel=cancel)
@@ -0,0 +1,138 @@
+import time
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+# Starting request rates (requests/second) per host, taken from the old fixed delays.
+# Hosts not listed start at DEFAULT_RATE.
+INITIAL_RATES = {
+    "translate.google.com": 1 / 0.3,
+    "www.churchofjesuschrist.org": 1 / 0.3,
+    "glosbe.com": 1 / 0.5,
+}
+DEFAULT_RATE = 2.0
+
+BACKOFF_STATUSES = (429, 503)
+
+def parse_retry_after(value):
+    """Returns a Retry-After header value (seconds or HTTP date) in seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class _HostState:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.next_slot = 0.0
+        self.fast_latency = None # Short-term latency average
+        self.slow_latency = None # Long-term latency baseline
+        self.samples = 0
+
+class AdaptiveRateController:
+    """
+    Per-host AIMD rate control. While a host answers quickly and without errors its request
+    rate grows additively; on 429/503, connection errors or latency well above its baseline
+    the rate is cut multiplicatively. Retry-After pauses the host for the requested time.
+    """
+    def __init__(self, min_rate: float = 0.1, max_rate: float = 20.0, increase: float = 0.1,
+                 decrease: float = 0.5, latency_factor: float = 2.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(INITIAL_RATES.get(host, DEFAULT_RATE))
+        return state
+
+    def acquire(self, host: str):
+        """Blocks until the host's next request slot."""
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            slot = max(now, state.next_slot)
+            state.next_slot = slot + 1.0 / state.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def record(self, host: str, status: int = None, latency: float = None, retry_after=None, error: bool = False):
+        """
+        Feeds back the outcome of a request.
+        Args:
+            status: HTTP status code, if a response arrived.
+            latency: Seconds the request took.
+            retry_after: Raw Retry-After header value.
+            error: True if the request failed without a response (timeout, connection error).
+        """
+        with self._lock:
+            state = self._state(host)
+
+            slow = False
+            if latency is not None and not error:
+                state.samples += 1
+                if state.fast_latency is None:
+                    state.fast_latency = state.slow_latency = latency
+                else:
+                    state.fast_latency += 0.3 * (latency - state.fast_latency)
+                    state.slow_latency += 0.05 * (latency - state.slow_latency)
+                slow = state.samples > 5 and state.fast_latency > self.latency_factor * state.slow_latency
+
+            if error or status in BACKOFF_STATUSES or slow:
+                old_rate = state.rate
+                state.rate = max(self.min_rate, state.rate * self.decrease)
+                reason = "slow responses" if slow else (f"status {status}" if status else "request error")
+                logger.info(f"Rate for {host}: {old_rate:.2f} -> {state.rate:.2f} req/s ({reason})")
+                if slow:
+                    # Re-baseline, so one slow spell only triggers one cut
+                    state.slow_latency = state.fast_latency
+            elif status is None or status < 500:
+                state.rate = min(self.max_rate, state.rate + self.increase)
+
+            pause = parse_retry_after(retry_after) if status in BACKOFF_STATUSES else None
+            if pause:
+                logger.warning(f"{host} asked to retry after {pause:.0f}s.")
+                state.next_slot = max(state.next_slot, time.monotonic() + pause)
+
+    def call(self, host: str, func, *args, **kwargs):
+        """
+        Runs func (a request made through a library we can't hook, e.g. deep_translator)
+        under the host's rate limit and feeds the outcome back.
+        """
+        self.acquire(host)
+        start = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            response = getattr(e, "response", None)
+            status = getattr(response, "status_code", None)
+            if status is None and ("429" in str(e) or "TooManyRequests" in type(e).__name__):
+                status = 429
+            headers = getattr(response, "headers", None) or {}
+            self.record(host, status=status, retry_after=headers.get("Retry-After"), error=status is None)
+            raise
+        self.record(host, status=200, latency=time.monotonic() - start)
+        return result
+
+    def rate(self, host: str) -> float:
+        with self._lock:
+            return self._state(host).rate
+
+_controller = AdaptiveRateController()
+
+def get_controller() -> AdaptiveRateController:
+    """Returns the process-wide controller shared by all HTTP callers."""
+    return _controller
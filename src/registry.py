@@ -0,0 +1,81 @@
+import os
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Components are registered as "module:attribute" strings and only imported on first use,
+# so a CLI call pays for pypdf/lxml/bs4/requests/deep_translator/libvoikko only if it needs them.
+
+LOADERS = {
+    '.pdf': 'src.document_loader:DocumentLoader',
+    '.docx': 'src.document_loader:DocumentLoader',
+    '.txt': 'src.document_loader:DocumentLoader',
+}
+
+SCRAPERS = {
+    'lds': 'src.scraper_lds:scrape_lds_chapter',
+    'generic': 'src.scraper_generic:scrape_generic',
+}
+
+TRANSLATORS = {
+    'google': 'src.translator:TranslatorService',
+    'glosbe': 'src.translator_glosbe:GlosbeTranslator',
+}
+
+PROCESSORS = {
+    'voikko': 'src.nlp_processor:VoikkoProcessor',
+}
+
+_resolved = {}
+
+def resolve(spec: str):
+    """Imports and returns the object named by a "module:attribute" spec."""
+    if spec not in _resolved:
+        module_name, attr = spec.split(':')
+        _resolved[spec] = getattr(importlib.import_module(module_name), attr)
+    return _resolved[spec]
+
+def _lookup(table: dict, name: str, kind: str) -> str:
+    try:
+        return table[name]
+    except KeyError:
+        raise ValueError(f"Unknown {kind}: {name} (available: {', '.join(sorted(table))})")
+
+def is_document(item: str) -> bool:
+    """True if the item is a local file with a supported document extension."""
+    return os.path.splitext(item)[1].lower() in LOADERS and os.path.exists(item)
+
+def get_loader(filename: str):
+    """Returns a document loader instance for the file's extension."""
+    ext = os.path.splitext(filename)[1].lower()
+    return resolve(_lookup(LOADERS, ext, "document type"))()
+
+def get_scraper(url: str):
+    """Returns the scrape function for a URL (LDS pages return segments, others raw text)."""
+    name = 'lds' if "churchofjesuschrist.org" in url else 'generic'
+    return resolve(SCRAPERS[name])
+
+def get_translator(name: str = 'google', **kwargs):
+    return resolve(_lookup(TRANSLATORS, name, "translator"))(**kwargs)
+
+def get_processor(name: str = 'voikko', **kwargs):
+    return resolve(_lookup(PROCESSORS, name, "processor"))(**kwargs)
+
+def load_segments(item: str, file_obj=None) -> list[str]:
+    """
+    Loads the text segments of one item: a local document, an LDS page or a generic web page.
+    Args:
+        item: File name/path or URL.
+        file_obj: Optional file-like object holding the document (e.g. an upload).
+    """
+    if file_obj is not None or is_document(item):
+        raw = get_loader(item).load_file(file_obj if file_obj is not None else item, item)
+        return [s.strip() for s in raw.split('\n') if s.strip()]
+
+    scraper = get_scraper(item)
+    result = scraper(item)
+    if isinstance(result, list):
+        return result
+    # Generic scrapers return raw text
+    return [s.strip() for s in result.split('\n') if s.strip()] if result else []
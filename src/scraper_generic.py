@@ -1,50 +1,24 @@
-import requests
-from bs4 import BeautifulSoup
 import logging
 
+from src import http_client
+from src.content_extractor import extract_from_tree, stop_condition
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def scrape_generic(url: str) -> str:
     """
     Scrapes the main text content from a generic web page.
-    Prioritizes text within <p> tags and common article containers.
+    Only the article body is kept (see content_extractor), not comments or teasers.
+    Fetch errors propagate (requests.RequestException), so callers can retry the page.
     """
-    try:
-        logger.info(f"Fetching URL: {url}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        # Remove unwanted elements
-        for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            script.extract()
-            
-        # Strategy: extracting all paragraphs
-        # This is a naive approach; could be improved with readability heuristics later
-        text_blocks = []
-        
-        # Extract title
-        if soup.title:
-            text_blocks.append(soup.title.get_text())
-            
-        # Extract headings and paragraphs
-        for element in soup.find_all(['h1', 'h2', 'h3', 'p']):
-            text = element.get_text(strip=True)
-            if text:
-                text_blocks.append(text)
-                
-        full_text = "\n".join(text_blocks)
-        logger.info(f"Extracted {len(full_text)} characters.")
-        return full_text
+    logger.info(f"Fetching URL: {url}")
+    # Parsed while downloading; size-capped and HTML only
+    tree = http_client.stream_html(url, stop=stop_condition(url))
 
-    except Exception as e:
-        logger.error(f"Error scraping {url}: {e}")
-        return ""
+    full_text = extract_from_tree(tree, url)
+    logger.info(f"Extracted {len(full_text)} characters.")
+    return full_text
 
 if __name__ == "__main__":
     # Test with a sample URL
@@ -1,69 +1,65 @@
-import requests
-from bs4 import BeautifulSoup
 import logging
 import re
 
+from src import http_client
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _has_class(tag: str, cls: str) -> str:
+    """XPath for <tag class="... cls ...">, like the CSS selector tag.cls."""
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+
+# Footnote markers, verse numbers and bookmark anchors
+NOISE_XPATH = " | ".join([_has_class("sup", "marker"), _has_class("span", "verse-number"), _has_class("a", "bookmark-anchor")])
+VERSE_XPATH = _has_class("p", "verse")
+FALLBACK_XPATH = "//main//p | //div[@role='main']//p"
+UI_ANCESTORS_XPATH = "ancestor::nav or ancestor::footer or ancestor::header"
+
+def _end_of_main(element) -> bool:
+    # Verses and talk paragraphs all sit inside the main content; the rest of the page isn't read
+    return element.tag == "main" or element.get("role") == "main"
+
 def scrape_lds_chapter(url: str) -> list[str]:
     """
     Scrapes an LDS scripture chapter or General Conference talk.
     Returns a list of clean strings (one per verse/paragraph).
+    Fetch errors propagate (requests.RequestException), so callers can retry the page.
     """
-    try:
-        logger.info(f"Fetching LDS URL: {url}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        extracted_texts = []
-        
-        # Strategy for Scriptures: look for paragraphs with class 'verse' or 'p' inside 'body-block'
-        # The structure often changes, but usually verses are <p class="verse">
+    logger.info(f"Fetching LDS URL: {url}")
+    tree = http_client.stream_html(url, stop=_end_of_main)
+    
+    extracted_texts = []
+    
+    # Strategy for Scriptures: look for paragraphs with class 'verse' or 'p' inside 'body-block'
+    # The structure often changes, but usually verses are <p class="verse">
+    
+    # Remove footnotes and verse numbers from the entire tree first to clean it up
+    for element in tree.xpath(NOISE_XPATH):
+        element.drop_tree() # Remove completely (keeps the text that follows it)
         
-        # Remove footnotes and verse numbers from the entire soup first to clean it up
-        for element in soup.select("sup.marker, span.verse-number, a.bookmark-anchor"):
-            element.decompose() # Remove completely
+    # Select verse paragraphs
+    verses = tree.xpath(VERSE_XPATH)
+    
+    if not verses:
+         # Broader fallback: paragraphs inside role="main" or <main>
+         verses = tree.xpath(FALLBACK_XPATH)
+         
+    for v in verses:
+         # Skip if it's likely a UI element (nav, footer check already done roughly but be safe)
+         if v.xpath(UI_ANCESTORS_XPATH):
+             continue
+         parts = [t.strip() for t in v.itertext()]
+         # Skip empty or very short lines (often UI artifacts) unless it's a very short verse
+         if len("".join(parts)) < 3:
+            continue
+         # Clean up extra spaces
+         text = re.sub(r'\s+', ' ', " ".join(p for p in parts if p))
+         if text:
+            extracted_texts.append(text)
             
-        # Select verse paragraphs
-        verses = soup.select("p.verse")
-        
-        if not verses:
-             # Broader fallback: paragraphs inside role="main" or <main>
-             verses = soup.select("main p, div[role='main'] p")
-             
-        # Filter out very short paragraphs which might be UI elements if we used broader selectors
-        filtered_verses = []
-        for v in verses:
-             # Skip if it's likely a UI element (nav, footer check already done roughly but be safe)
-             if v.find_parent(['nav', 'footer', 'header']):
-                 continue
-             text = v.get_text(strip=True)
-             # Skip empty or very short lines (often UI artifacts) unless it's a very short verse
-             if len(text) < 3: 
-                continue
-             filtered_verses.append(v)
-             
-        verses = filtered_verses
-
-        for v in verses:
-            text = v.get_text(separator=' ', strip=True)
-            # Clean up extra spaces
-            text = re.sub(r'\s+', ' ', text)
-            if text:
-                extracted_texts.append(text)
-                
-        logger.info(f"Extracted {len(extracted_texts)} segments.")
-        return extracted_texts
-
-    except Exception as e:
-        logger.error(f"Error scraping LDS URL {url}: {e}")
-        return []
+    logger.info(f"Extracted {len(extracted_texts)} segments.")
+    return extracted_texts
 
 def scrape_lds_parallel(url_fi: str) -> list[tuple[str, str]]:
     """
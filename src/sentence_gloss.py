@@ -0,0 +1,206 @@
+import os
+import re
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from src.pipeline import Stage
+from src.translator import BATCH_CHARS
+
+logger = logging.getLogger(__name__)
+
+# English function words never make a gloss (and are too common to align)
+STOPWORDS = frozenset("""
+a an the and or but nor so yet if then than as of in on at to from by for with without into onto
+upon about over under after before between through during is am are was were be been being
+has have had do does did will would shall should can could may might must not no it its this
+that these those there here he she they we you i me him her them us my your his our their who
+whom whose which what when where why how all any some each every also very just only even too
+""".split())
+WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+MIN_SEGMENTS = 3 # A lemma and its English word must share this many translated segments
+MIN_DICE = 0.7 # ... with a Dice coefficient of at least this
+MIN_MARGIN = 0.2 # ... which must beat the lemma's runner-up word by this much
+MAX_LEMMA_SHARE = 0.5 # Lemmas in more of the run's segments are function words (olla, se, ...): never aligned
+MIN_SHARE_SEGMENTS = 10 # ... judged once the run has translated this many segments
+MIN_TARGETS_PER_REQUEST = 3 # Batches are sent only if each request can align this many lemmas
+VERIFY_MIN_CHECKS = 3 # Known words needed in a batch to judge it
+VERIFY_MIN_HITS = 0.5 # Share of known words whose cached gloss must show up in the translation
+
+def english_words(text: str) -> set:
+    return {w for w in WORD.findall(text.lower()) if w not in STOPWORDS and len(w) > 1}
+
+class GlossStore:
+    """
+    Glosses derived by alignment (lemma -> English word), in their own JSON file so they
+    never mix with real translations in the translation cache. Cards built from them
+    have Provenance 'aligned'. Thread-safe.
+    """
+    def __init__(self, path: str = "aligned_glosses.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.glosses = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.glosses = json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load aligned glosses: {e}")
+
+    def get(self, lemma: str):
+        return self.glosses.get(lemma)
+
+    def __contains__(self, lemma: str) -> bool:
+        return lemma in self.glosses
+
+    def __len__(self) -> int:
+        return len(self.glosses)
+
+    def words(self) -> set:
+        """English words already used by a gloss (each word glosses one lemma only)."""
+        with self._lock:
+            return set(self.glosses.values())
+
+    def add(self, glosses: dict):
+        if not glosses:
+            return
+        with self._lock:
+            self.glosses.update(glosses)
+            tmp = self.path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.glosses, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+class SentenceGlosser(Stage):
+    """
+    Pipeline stage (after lemmatizing, before the cards) that translates whole segments in
+    batches (TranslatorService.translate_segments) instead of one request per word, and
+    derives glosses for the item's new lemmas by aligning them with the translations.
+
+    The card stage translates an item's lemmas right after this stage, so only lemmas
+    that can be aligned now are targets: those in at least MIN_SEGMENTS segments counting
+    the earlier items. An item's segments are sent only if there are enough targets to
+    pay for the batch requests (MIN_TARGETS_PER_REQUEST); otherwise the item's words are
+    left to the usual per-lemma translation.
+
+    Alignment is competitive linking on Dice coefficients of lemma/English word
+    co-occurrence over all segments translated in the run: a pair is accepted only if
+    the word is the lemma's clearly best candidate, the lemma is the word's best
+    candidate, and neither is taken by another gloss. Everything else is left to the
+    usual per-lemma translation.
+
+    The translation cache serves as the dictionary: glosses of known lemmas explain
+    (remove) their English words, and a batch in which known lemmas' glosses mostly don't
+    appear is treated as misaligned and ignored. Derived glosses go to the GlossStore,
+    never into the translation cache.
+    """
+    def __init__(self, builder, glosses: GlossStore):
+        super().__init__("gloss", self._gloss, 1)
+        self.builder = builder
+        self.translator = builder.translator
+        self.glosses = glosses
+        self.segments = 0 # Translated segments that were aligned
+        self.lemma_counts = Counter() # Segments containing the (unknown) lemma
+        self.word_counts = Counter() # Segments containing the English word
+        self.by_lemma = defaultdict(Counter) # lemma -> English word -> segments with both
+        self.by_word = defaultdict(Counter) # English word -> lemma -> segments with both
+        self.aligned = 0 # Glosses derived, i.e. per-lemma requests saved
+        self.requests = 0 # Batch requests spent
+
+    def stop(self):
+        super().stop()
+        if self.requests:
+            logger.info(f"Sentence glosses: {self.aligned} word requests saved, {self.requests} batch requests spent.")
+
+    def _known(self, lemma: str):
+        return self.translator.cache.get(lemma.strip().lower())
+
+    def _resolved(self, lemma: str) -> bool:
+        return lemma in self.glosses or self._known(lemma) is not None
+
+    def _gloss(self, item):
+        in_item = Counter(l for lemmas in item.lemma_lists for l in set(lemmas))
+        targets = {l for l in self.builder.unseen(item.lemma_lists)
+                   if not self._resolved(l) and self.lemma_counts[l] + in_item[l] >= MIN_SEGMENTS}
+        if not targets:
+            return
+        # Only segments that can teach us something are sent, and only if it pays off
+        picked = [i for i, lemmas in enumerate(item.lemma_lists) if targets.intersection(lemmas)]
+        size = sum(len(item.segments[i]) + 1 for i in picked)
+        if len(targets) < MIN_TARGETS_PER_REQUEST * -(-size // BATCH_CHARS):
+            return
+        before = self.translator.segment_requests
+        translations = self.translator.translate_segments([item.segments[i] for i in picked])
+        self.requests += self.translator.segment_requests - before
+
+        pairs = [] # (unknown lemmas, unexplained English words) per translated segment
+        checks = hits = 0
+        for i, english in zip(picked, translations):
+            if not english:
+                continue
+            words = english_words(english)
+            unknown = set()
+            for lemma in set(item.lemma_lists[i]):
+                gloss = self._known(lemma)
+                if gloss is None:
+                    if lemma in targets:
+                        unknown.add(lemma)
+                    continue
+                gloss_words = english_words(gloss)
+                if gloss_words:
+                    checks += 1
+                    if gloss_words & words:
+                        hits += 1
+                    words -= gloss_words
+            pairs.append((unknown, words))
+
+        if checks >= VERIFY_MIN_CHECKS and hits / checks < VERIFY_MIN_HITS:
+            logger.warning(f"{item.item}: only {hits}/{checks} known words found in the translations, not aligning.")
+            return
+
+        for unknown, words in pairs:
+            self.segments += 1
+            self.lemma_counts.update(unknown)
+            self.word_counts.update(words)
+            for lemma in unknown:
+                self.by_lemma[lemma].update(words)
+                for word in words:
+                    self.by_word[word][lemma] += 1
+
+        taken = self.glosses.words()
+        glosses = {}
+        for lemma in targets:
+            word = self._align(lemma)
+            if word and word not in taken:
+                glosses[lemma] = word
+                taken.add(word)
+        self.glosses.add(glosses)
+        self.aligned += len(glosses)
+        logger.info(f"{item.item}: {len(glosses)}/{len(targets)} new words glossed from "
+                    f"{sum(1 for t in translations if t)} translated segments.")
+
+    def _dice(self, lemma: str, word: str, together: int) -> float:
+        return 2 * together / (self.lemma_counts[lemma] + self.word_counts[word])
+
+    def _align(self, lemma: str):
+        """The English word lemma is confidently and exclusively aligned with, or None."""
+        n = self.lemma_counts[lemma]
+        if n < MIN_SEGMENTS:
+            return None
+        if self.segments >= MIN_SHARE_SEGMENTS and n > MAX_LEMMA_SHARE * self.segments:
+            return None
+        scores = sorted(((self._dice(lemma, word, together), word)
+                         for word, together in self.by_lemma[lemma].items()), reverse=True)
+        if not scores:
+            return None
+        best, word = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        if best < MIN_DICE or best - runner_up < MIN_MARGIN or self.by_lemma[lemma][word] < MIN_SEGMENTS:
+            return None
+        # The word must not fit another unresolved lemma as well
+        for other, together in self.by_word[word].items():
+            if other != lemma and self._dice(other, word, together) >= best and not self._resolved(other):
+                return None
+        return word
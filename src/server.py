@@ -0,0 +1,209 @@
+import os
+import hmac
+import json
+import logging
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src import registry
+from src.cards import CardBuilder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+class SuomiService:
+    """
+    The warm state shared by all clients of the daemon: one Voikko handle and one
+    translator (with its cache), created once when the server starts.
+    """
+    def __init__(self, translator_name: str = "google"):
+        self.vp = registry.get_processor()
+        self.translator = registry.get_translator(translator_name)
+        # Load the cache now rather than on the first request
+        logger.info(f"Translation cache loaded ({len(self.translator.cache)} words).")
+
+    def lemmatize(self, payload: dict) -> dict:
+        lemmas = self.vp.lemmatize_many(payload["sentences"], payload.get("strict", True))
+        return {"lemmas": lemmas}
+
+    def sentences(self, payload: dict) -> dict:
+        return {"sentences": self.vp.split_many(payload["segments"])}
+
+    def translate(self, payload: dict) -> dict:
+        return {"translations": {w: self.translator.translate(w) for w in payload["words"]}}
+
+    def cards(self, payload: dict) -> dict:
+        builder = CardBuilder(
+            self.translator,
+            no_translate=payload.get("no_translate", False),
+            filter_untranslated=payload.get("filter_untranslated", True),
+            seen=set(payload.get("seen", [])),
+        )
+        sentences = self.vp.split_many(payload["sentences"])
+        lemma_lists = self.vp.lemmatize_many(sentences, payload.get("strict", True))
+        return {"cards": builder.build_many(lemma_lists)}
+
+    def vocab(self, payload: dict) -> dict:
+        rows, total = self.translator.query_cache(payload.get("search", ""), payload.get("offset", 0), payload.get("limit", 50))
+        return {"rows": rows, "total": total}
+
+    def clear_cache(self, payload: dict) -> dict:
+        self.translator.clear_cache()
+        return {"status": "ok"}
+
+    def health(self, payload: dict = None) -> dict:
+        return {"status": "ok", "cache_size": len(self.translator.cache)}
+
+class CoordinatorService(SuomiService):
+    """
+    The daemon plus a work broker (src/broker.py) over a job store: workers claim URLs,
+    report cards back, and translate through this process's shared cache.
+    """
+    def __init__(self, broker, translator_name: str = "google"):
+        super().__init__(translator_name)
+        self.broker = broker
+
+    def claim(self, payload: dict) -> dict:
+        return self.broker.claim(payload["worker"])
+
+    def seen(self, payload: dict) -> dict:
+        return {"seen": self.broker.seen(payload["lemmas"])}
+
+    def complete(self, payload: dict) -> dict:
+        return {"stored": self.broker.complete(payload["url"], payload["cards"], payload["lemmas"])}
+
+    def fail(self, payload: dict) -> dict:
+        self.broker.fail(payload["url"], payload["error"])
+        return {"status": "ok"}
+
+    def status(self, payload: dict = None) -> dict:
+        return self.broker.status()
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, so thin clients reuse one connection
+    service = None
+    token = None # If set, every request must carry "Authorization: Bearer <token>"
+
+    ROUTES = {
+        "/lemmatize": "lemmatize",
+        "/sentences": "sentences",
+        "/translate": "translate",
+        "/cards": "cards",
+        "/vocab": "vocab",
+        "/clear_cache": "clear_cache",
+        "/health": "health",
+    }
+    # Read-only routes may also be fetched with GET; everything else needs a JSON POST, which
+    # a web page can't send cross-site without a CORS preflight (that this server never allows)
+    GET_ROUTES = frozenset(["/health", "/vocab"])
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, payload: dict):
+        route = self.ROUTES.get(self.path)
+        if route is None:
+            self._send(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        try:
+            self._send(200, getattr(self.service, route)(payload))
+        except KeyError as e:
+            self._send(400, {"error": f"Missing field: {e}"})
+        except Exception as e:
+            logger.error(f"Error handling {self.path}: {e}")
+            self._send(500, {"error": str(e)})
+
+    def _authorized(self) -> bool:
+        if not self.token:
+            return True
+        given = self.headers.get("Authorization", "")
+        if hmac.compare_digest(given.encode("utf-8"), f"Bearer {self.token}".encode("utf-8")):
+            return True
+        self._send(401, {"error": "Missing or wrong token"})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path in self.ROUTES and self.path not in self.GET_ROUTES:
+            self._send(405, {"error": f"{self.path} needs POST"})
+            return
+        self._dispatch({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if not self._authorized():
+            self.rfile.read(length)
+            return
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self.rfile.read(length) # Keep the connection usable
+            self._send(415, {"error": "Content-Type must be application/json"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send(400, {"error": f"Invalid JSON: {e}"})
+            return
+        self._dispatch(payload)
+
+    def log_message(self, format, *args):
+        # Default implementation writes every request to stderr (and needs a TCP client address)
+        logger.debug(format % args)
+
+class _CoordinatorHandler(_Handler):
+    ROUTES = dict(_Handler.ROUTES, **{
+        "/broker/claim": "claim",
+        "/broker/seen": "seen",
+        "/broker/complete": "complete",
+        "/broker/fail": "fail",
+        "/broker/status": "status",
+    })
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(service, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None, token: str = None):
+    """
+    Creates (but doesn't start) a server for the service: a CoordinatorService also gets
+    the broker endpoints. Listens on a Unix socket if socket_path is given, otherwise on
+    host:port. With a token, requests without it are refused. Returns (server, address).
+    """
+    base = _CoordinatorHandler if isinstance(service, CoordinatorService) else _Handler
+    handler = type("SuomiHandler", (base,), {"service": service, "token": token})
+    if not token and not socket_path and host not in ("127.0.0.1", "localhost", "::1"):
+        logger.warning(f"Serving on {host} without --token: anyone who can reach the port can use it.")
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path) # Stale socket from a previous run
+        server = UnixHTTPServer(socket_path, handler)
+        address = f"unix:{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        address = f"http://{host}:{port}"
+    return server, address
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None, translator_name: str = "google",
+          token: str = None):
+    """
+    Runs the lemmatize/translate daemon until interrupted.
+    Listens on a Unix socket if socket_path is given, otherwise on host:port.
+    """
+    server, address = make_server(SuomiService(translator_name), host, port, socket_path, token)
+    logger.info(f"Serving on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down.")
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -1,79 +1,232 @@
 import json
 import os
-import time
+import bisect
 import logging
-from deep_translator import GoogleTranslator
+import threading
+
+from src.rate_control import get_controller
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TRANSLATE_HOST = "translate.google.com"
+BATCH_CHARS = 4500 # Google Translate takes at most 5000 characters per request
+
 class TranslatorService:
     def __init__(self, source_lang="fi", target_lang="en", cache_file="translation_cache.json"):
         self.source_lang = source_lang
         self.target_lang = target_lang
         self.cache_file = cache_file
-        self.cache = self._load_cache()
-        self.engine = GoogleTranslator(source=source_lang, target=target_lang)
-        
+        self._lock = threading.RLock() # Guards the cache when shared between GUI jobs
+        self._cache_mtime = None
+        self._sorted_keys = None # Lazily built index for query_cache()
+        self.segment_requests = 0 # Requests sent by translate_segments()
+        # The cache file and the translation engine are loaded on first use
+        self._cache = None
+        self._engine = None
+
+    @property
+    def cache(self) -> dict:
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    self._cache = self._load_cache()
+        return self._cache
+
+    @cache.setter
+    def cache(self, value: dict):
+        self._cache = value
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from deep_translator import GoogleTranslator
+            self._engine = GoogleTranslator(source=self.source_lang, target=self.target_lang)
+        return self._engine
+
+    def _file_mtime(self):
+        try:
+            return os.path.getmtime(self.cache_file)
+        except OSError:
+            return None
+
+    def _read_cache(self):
+        """Reads the cache file (raises if it can't be parsed). Returns (cache, mtime)."""
+        mtime = self._file_mtime()
+        if mtime is None:
+            return {}, None
+        with open(self.cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f), mtime
+
     def _load_cache(self):
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Failed to load cache: {e}")
-                return {}
-        return {}
-        
+        self._sorted_keys = None
+        try:
+            cache, self._cache_mtime = self._read_cache()
+            return cache
+        except Exception as e:
+            logger.error(f"Failed to load cache: {e}")
+            self._cache_mtime = self._file_mtime()
+            return {}
+
     def _save_cache(self):
+        # Written to a temp file and swapped in, so readers (other processes reloading
+        # the cache) never see a half-written file
+        tmp = f"{self.cache_file}.{os.getpid()}.tmp"
         try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            with self._lock:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(self.cache, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, self.cache_file)
+                self._cache_mtime = self._file_mtime()
         except Exception as e:
             logger.error(f"Failed to save cache: {e}")
 
+    def reload_if_stale(self) -> bool:
+        """
+        Reloads the cache if the file was changed by another process (e.g. a CLI run
+        while the GUI is open). Cheap enough to call on every Streamlit rerun.
+        Returns:
+            bool: True if the cache was reloaded.
+        """
+        with self._lock:
+            if self._cache is None or self._file_mtime() == self._cache_mtime:
+                return False
+            logger.info("Translation cache changed on disk, reloading.")
+            try:
+                cache, mtime = self._read_cache()
+            except Exception as e:
+                # Keep the current cache and its mtime, so the next call tries again
+                logger.error(f"Failed to reload cache, keeping the loaded one: {e}")
+                return False
+            self.cache, self._cache_mtime = cache, mtime
+            self._sorted_keys = None
+            return True
+
     def translate(self, word: str) -> str:
         """
         Fetches translation using deep-translator (Google).
         """
+        return self.translate_with_provenance(word)[0]
+
+    def translate_with_provenance(self, word: str) -> tuple[str, str]:
+        """
+        Like translate(), but also returns where the translation came from:
+        'cache', 'google' (fetched now) or 'error'.
+        """
         word = word.strip().lower()
         if not word:
-            return ""
+            return "", "error"
 
         # Check cache first
         if word in self.cache:
-            return self.cache[word]
+            return self.cache[word], "cache"
             
         try:
-            # Politeness delay (Google blocks if too fast)
-            time.sleep(0.3) 
-            
             logger.info(f"Translating: {word}")
             
-            # GoogleTranslator call
-            result = self.engine.translate(word)
+            # GoogleTranslator call, paced by the shared rate controller (Google blocks if too fast)
+            result = get_controller().call(TRANSLATE_HOST, self.engine.translate, word)
             
             if not result or result == word:
                 # Sometimes it returns same word if unknown.
                 # We can't distinguish easily, but usually it works.
                 pass
 
-            self.cache[word] = result
-            self._save_cache()
-            return result
+            with self._lock:
+                self.cache[word] = result
+                self._sorted_keys = None
+                self._save_cache()
+            return result, "google"
 
         except Exception as e:
             # 429 Too Many Requests etc.
             logger.error(f"Translation error for {word}: {e}")
-            return "[Error]"
+            return "[Error]", "error"
+
+    def translate_segments(self, segments: list[str], max_chars: int = BATCH_CHARS) -> list:
+        """
+        Translates whole text segments, as many per request as fit in max_chars (joined
+        by newlines). Not cached. Returns one translation per segment; None for segments
+        that are too long, or whose request failed or didn't come back line for line.
+        """
+        texts = [" ".join(segment.split()) for segment in segments] # Newlines would break the line mapping
+        results = [None] * len(texts)
+        batch, size = [], 0
+
+        def flush():
+            if not batch:
+                return
+            text = "\n".join(texts[i] for i in batch)
+            self.segment_requests += 1
+            try:
+                translated = get_controller().call(TRANSLATE_HOST, self.engine.translate, text)
+            except Exception as e:
+                logger.error(f"Batch translation error ({len(batch)} segments): {e}")
+                return
+            lines = (translated or "").split("\n")
+            if len(lines) != len(batch):
+                logger.warning(f"Batch translation returned {len(lines)} lines for {len(batch)} segments, discarded.")
+                return
+            for i, line in zip(batch, lines):
+                results[i] = line.strip()
+
+        for i, text in enumerate(texts):
+            if not text or len(text) > max_chars:
+                continue
+            if size + len(text) + 1 > max_chars:
+                flush()
+                batch, size = [], 0
+            batch.append(i)
+            size += len(text) + 1
+        flush()
+        return results
 
     def get_cache_as_list(self) -> list[dict]:
         """Returns the cache as a list of dicts for display."""
-        return [{"Finnish": k, "English": v} for k, v in self.cache.items()]
+        return list(self.iter_cache())
+
+    def iter_cache(self):
+        """Yields cache entries as dicts without building a list of the whole cache."""
+        with self._lock:
+            items = list(self.cache.items()) # Snapshot, the dict may change while we stream
+        for k, v in items:
+            yield {"Finnish": k, "English": v}
+
+    def query_cache(self, search: str = "", offset: int = 0, limit: int = 50) -> tuple[list[dict], int]:
+        """
+        Returns one page of the cache, sorted by Finnish word.
+        Uses a sorted key index, so prefix search and paging stay fast on large caches
+        instead of converting the whole cache for every view.
+        Args:
+            search: Finnish prefix to filter on (case-insensitive).
+            offset: Index of the first row of the page.
+            limit: Maximum number of rows to return.
+        Returns:
+            (rows, total): The page as a list of dicts and the total number of matches.
+        """
+        with self._lock:
+            if self._sorted_keys is None:
+                self._sorted_keys = sorted(self.cache)
+            keys = self._sorted_keys
+
+        search = search.strip().lower()
+        if search:
+            # All keys with this prefix form one contiguous run in the sorted list
+            start = bisect.bisect_left(keys, search)
+            end = bisect.bisect_left(keys, search + '\uffff', lo=start)
+        else:
+            start, end = 0, len(keys)
+
+        total = end - start
+        page = keys[start + offset:min(start + offset + limit, end)]
+        rows = [{"Finnish": k, "English": self.cache[k]} for k in page]
+        return rows, total
 
     def clear_cache(self):
         """Clears the in-memory cache and overwrites the file with check empty JSON."""
-        self.cache = {}
+        with self._lock:
+            self.cache = {}
+            self._sorted_keys = None
         try:
             self._save_cache()
             logger.info("Cache file reset to empty.")
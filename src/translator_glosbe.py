@@ -1,8 +1,9 @@
 import requests
-import time
 import logging
 from bs4 import BeautifulSoup
 
+from src import http_client
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -16,7 +17,7 @@ class GlosbeTranslator:
         self.base_url = f"https://glosbe.com/{source_lang}/{target_lang}"
         self.session = requests.Session()
         self.session.headers.update({
-             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+             'User-Agent': http_client.USER_AGENT,
              'Accept-Language': 'en-US,en;q=0.9',
         })
         self.cache_file = cache_file
@@ -43,23 +44,25 @@ class GlosbeTranslator:
         """
         Fetches translation from Glosbe by scraping the HTML results page.
         """
+        return self.translate_with_provenance(word)[0]
+
+    def translate_with_provenance(self, word: str) -> tuple[str, str]:
+        """Like translate(), but also returns 'cache', 'glosbe' or 'error' as the source."""
         # Check cache first
         if word in self.cache:
             # logger.info(f"Cache hit for: {word}") 
-            return self.cache[word]
+            return self.cache[word], "cache"
             
         try:
-            # Politeness delay
-            time.sleep(0.5) 
-            
             url = f"{self.base_url}/{word}"
             logger.info(f"Translating: {word}")
             
-            response = self.session.get(url, timeout=10)
+            # Politeness: paced by the shared per-host rate controller
+            response = http_client.get(url, session=self.session)
             if response.status_code == 404:
                 self.cache[word] = "[Not Found]"
                 self._save_cache()
-                return "[Not Found]"
+                return "[Not Found]", "glosbe"
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'lxml')
@@ -85,11 +88,11 @@ class GlosbeTranslator:
             
             self.cache[word] = result
             self._save_cache()
-            return result
+            return result, "glosbe"
 
         except Exception as e:
             logger.error(f"Translation error for {word}: {e}")
-            return "[Error]"
+            return "[Error]", "error"
 
 if __name__ == "__main__":
     gt = GlosbeTranslator()
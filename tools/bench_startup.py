@@ -0,0 +1,82 @@
+"""
+Startup benchmark for the CLI.
+
+main.py is called thousands of times from cron and shell loops, so importing it must stay
+cheap. This script checks that `import main` doesn't pull in any heavy dependency and
+times a few fast-path subcommands in fresh interpreters.
+
+Usage:
+    python3 tools/bench_startup.py [--runs 5] [--budget-ms 300]
+Exits with status 1 if a heavy module is imported eagerly or a command exceeds the budget.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported by the subcommands that need them
+HEAVY_MODULES = ["requests", "bs4", "lxml", "pypdf", "docx", "deep_translator", "libvoikko", "pandas", "pyarrow"]
+
+COMMANDS = {
+    "--help": ["--help"],
+    "--vocab": ["--vocab"],
+    "--merge": ["--merge", "a.csv", "b.csv", "--output", "merged.csv"],
+}
+
+def check_eager_imports() -> list[str]:
+    code = (
+        "import sys; sys.path.insert(0, %r); import main; "
+        "print(' '.join(m for m in %r if m in sys.modules))" % (ROOT, HEAVY_MODULES)
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return out.stdout.split()
+
+def time_command(args: list[str], runs: int, cwd: str) -> float:
+    """Returns the best wall time (ms) of running main.py with args in a fresh interpreter."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, "main.py")] + args, cwd=cwd,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command (best is reported)")
+    parser.add_argument("--budget-ms", type=float, default=300, help="Maximum allowed wall time per command")
+    args = parser.parse_args()
+
+    failed = False
+    eager = check_eager_imports()
+    if eager:
+        print(f"FAIL: 'import main' eagerly imports: {', '.join(eager)}")
+        failed = True
+    else:
+        print("OK: no heavy modules imported by 'import main'")
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"])
+    interpreter_ms = (time.perf_counter() - start) * 1000
+    print(f"Bare interpreter: {interpreter_ms:.0f} ms")
+
+    # Run in an empty directory so --vocab reads an empty cache and --merge has tiny inputs
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("a.csv", "b.csv"):
+            with open(os.path.join(tmp, name), "w", encoding="utf-8") as f:
+                f.write("Front;Back;Tags\ntalo;house;suomi-scraper\n")
+
+        for label, cmd in COMMANDS.items():
+            ms = time_command(cmd, args.runs, tmp)
+            status = "OK" if ms <= args.budget_ms else "FAIL"
+            failed |= status == "FAIL"
+            print(f"{status}: main.py {label:<8} {ms:6.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
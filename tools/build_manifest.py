@@ -0,0 +1,38 @@
+"""
+Builds (or refreshes) the scripture chapter manifests that `main.py --recursive` reads.
+
+Usage:
+    python3 tools/build_manifest.py                 # all volumes, Finnish
+    python3 tools/build_manifest.py --lang fin eng  # several languages
+    python3 tools/build_manifest.py --volume bofm --force
+"""
+import os
+import sys
+import argparse
+import logging
+
+# Allow running as `python3 tools/build_manifest.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.manifest import ChapterManifest, VOLUMES, DEFAULT_DIR, MAX_AGE_DAYS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the scripture chapter manifests")
+    parser.add_argument("--lang", nargs="+", default=["fin"], help="Language codes (default: fin)")
+    parser.add_argument("--volume", nargs="+", choices=VOLUMES, default=VOLUMES, help="Volumes (default: all)")
+    parser.add_argument("--dir", default=DEFAULT_DIR, help=f"Manifest directory (default: {DEFAULT_DIR})")
+    parser.add_argument("--max-age", type=float, default=MAX_AGE_DAYS, help="Rebuild volumes older than this many days")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if not stale")
+    args = parser.parse_args()
+
+    for lang in args.lang:
+        manifest = ChapterManifest(lang, args.dir, args.max_age)
+        for volume in args.volume:
+            chapters = manifest.chapters(volume, refresh=args.force)
+            logger.info(f"{lang}/{volume}: {len(chapters)} chapters")
+        logger.info(f"Wrote {manifest.path}")
+
+if __name__ == "__main__":
+    main()